@@ -29,6 +29,17 @@
 #  a function (or object) that directly address that
 
 
+import ast
+import functools
+import hashlib
+import itertools
+import json
+import keyword
+import math
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
 Number = Decimal
 LOW_PRICE = Number('1.0')
@@ -37,11 +48,19 @@ LOW_PRICE = Number('1.0')
 LOW_PRICE  = 1.0
 HIGH_PRICE = 10.0
 INCREMENT  = 0.1
-"""
-FIXED_COST
-VARIABLE_COST
-BASE_PRICE
-"""
+
+# Cost and demand.  At BASE_PRICE, BASE_ATTENDANCE people come, and
+# every PRICE_STEP change in price changes that by ATTENDANCE_CHANGE.
+FIXED_COST        = 180
+VARIABLE_COST     = 0.04
+BASE_PRICE        = 5.0
+BASE_ATTENDANCE   = 120
+ATTENDANCE_CHANGE = 15
+PRICE_STEP        = 0.10
+
+# The keyword arguments of compute_profit() for each of the above
+PARAMETERS = ('fixed_cost', 'variable_cost', 'base_price', 'base_attendance',
+              'attendance_change', 'price_step')
 
 
 # start the problem 
@@ -62,9 +81,27 @@ def best_ticket_price(low_price, high_price, increment):
 
 # more general function that allows any profit function to be supplied 
 # # could be reuse in other applications 
-def best_price(low_price, high_price, increment, profit_func):
-    #... 
-    #return max()
+#
+# vectorized=True calls profit_func with a whole NumPy array of prices
+# at once (compute_profit() and the expected_*() helpers work on arrays
+# as well as single prices).  Much faster for fine grids.
+#
+# strategy='golden' only looks at a few prices, for when profit_func is
+# expensive (see best_price_golden()).
+#
+# exact=True works in whole cents with integers (see best_price_exact()).
+def best_price(low_price, high_price, increment, profit_func, vectorized=False, strategy='scan',
+               exact=False):
+    if strategy not in ('scan', 'golden'):
+        raise ValueError(f'unknown search strategy {strategy!r}')
+    if exact:
+        return best_price_exact(low_price, high_price, increment, profit_func, vectorized, strategy)
+    if strategy == 'golden':
+        if vectorized:
+            raise ValueError('golden section search is not vectorized')
+        return best_price_golden(low_price, high_price, increment, profit_func)
+    if vectorized:
+        return best_price_vectorized(low_price, high_price, increment, profit_func)
     price = low_price
     best_price = price
     best_profit = profit_func(price)
@@ -78,26 +115,1070 @@ def best_price(low_price, high_price, increment, profit_func):
     return best_price
 
 
-def compute_profit(price):
-    attendees = expected_attendees(price)
+# Prices are evaluated this many at a time, so that a grid of millions
+# of prices doesn't need millions of floats for every temporary array
+CHUNK = 1_000_000
+
+# The grid is low_price + k * increment for k = 0, 1, 2, ... built from
+# an integer arange.  Adding up the increment one at a time (as above)
+# slowly drifts away from the exact grid prices.  For each chunk,
+# argmax() finds the best profit in one pass and picks the first one on
+# ties, just like the loop.
+def best_price_vectorized(low_price, high_price, increment, profit_func):
+    import numpy as np
+    count = int(np.floor((high_price - low_price) / increment + 1e-9)) + 1
+    best_price = low_price
+    best_profit = None
+    for start in range(0, count, CHUNK):
+        prices = low_price + np.arange(start, min(start + CHUNK, count)) * increment
+        profits = profit_func(prices)
+        i = int(np.argmax(profits))
+        if best_profit is None or profits[i] > best_profit:
+            best_profit = profits[i]
+            best_price = prices[i].item()
+    return best_price
+
+# Exact pricing.  Floats can't hold 0.1 exactly, so a float grid drifts
+# and ties between prices come out differently depending on rounding.
+# Decimal is exact but much slower.  Here every price is a whole number
+# of cents, every grid point is low + k*increment in integer cents, and
+# profit_func works on integers as well (see compute_profit_cents()).
+# The answer is always the same, and it comes back as a Decimal:
+#
+#    >>> best_price(1.0, 10.0, 0.10, compute_profit_cents, exact=True)
+#    Decimal('2.90')
+#
+# Works with vectorized=True (an integer array of cents) and with
+# strategy='golden'.  Unlike the float loop, it stops at high_price.
+#
+# A profit function in dollars would quietly get the wrong numbers
+# (290 for $2.90), so profit_func has to be marked with @cents_profit
+# (or be a functools.partial of one that is).
+def best_price_exact(low_price, high_price, increment, profit_func, vectorized=False,
+                     strategy='scan'):
+    if not _in_cents(profit_func):
+        raise TypeError('exact=True needs a profit function of whole cents (see cents_profit())')
+    low, high, step = cents(low_price), cents(high_price), cents(increment)
+    if step <= 0:
+        raise ValueError('increment must be at least one cent')
+    high = low + (high - low) // step * step
+    if strategy == 'golden':
+        best = best_price_golden(low, high, step, profit_func)
+    elif vectorized:
+        best = best_price_vectorized(low, high, step, profit_func)
+    else:
+        best = max(range(low, high + 1, step), key=profit_func)
+    return Decimal(best).scaleb(-2)
+
+# A price in dollars (float, str or Decimal) as a whole number of cents
+def cents(dollars):
+    value = Decimal(str(dollars)) * 100
+    if value != value.to_integral_value():
+        raise ValueError(f'{dollars} is not a whole number of cents')
+    return int(value)
+
+# Marks a profit function as taking prices in whole cents
+def cents_profit(func):
+    func.in_cents = True
+    return func
+
+def _in_cents(func):
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, 'in_cents', False)
+
+# Golden section search.  Profit goes up with the price, peaks, then
+# goes down again (it's "unimodal").  So comparing two prices c < d in
+# the range says which side the peak can't be on: if profit(c) >=
+# profit(d), it isn't to the right of d, otherwise it isn't at or left
+# of c.  Placing c and d at the golden ratio cuts the range down by
+# about 0.618 each time, so a grid of n prices takes about
+# 1.44*log2(n) calls to profit_func instead of n.
+#
+# The search runs on the grid index k (price = low_price + k *
+# increment), so it lands on exactly the grid prices a full scan would
+# look at.  Nothing is evaluated twice.  At the end, every evaluated
+# price is checked: going left to right, profits have to go up to the
+# best one and then down.  If they don't, the function isn't unimodal
+# and it falls back to evaluating every price.  So does a flat stretch
+# at the top, where two equal profits don't say which way the peak is.
+GOLDEN = (5 ** 0.5 - 1) / 2
+
+def best_price_golden(low_price, high_price, increment, profit_func):
+    count = int(math.floor((high_price - low_price) / increment + 1e-9)) + 1
+    seen = { }
+    def profit(k):
+        if k not in seen:
+            seen[k] = profit_func(low_price + k * increment)
+        return seen[k]
+
+    a, b = 0, count - 1
+    ties = []
+    while b - a > 4:
+        step = round((b - a) * GOLDEN)
+        c, d = b - step, a + step
+        if profit(c) > profit(d):
+            b = d
+        elif profit(c) < profit(d):
+            a = c + 1
+        else:
+            # The peak is between them, unless they're on a flat stretch
+            # that could be the top (checked below)
+            a, b = c, d
+            ties.append(profit(c))
+    best = max(range(a, b + 1), key=lambda k: (profit(k), -k))
+    # The neighbours too, so a peak at the edge of [a, b] gets checked
+    profit(max(best - 1, 0))
+    profit(min(best + 1, count - 1))
+
+    if seen[best] in ties or not _unimodal(seen, best):
+        best = max(range(count), key=lambda k: (profit(k), -k))
+    return low_price + best * increment
+
+# Do the profits seen rise (or stay level) up to best, and fall (or
+# stay level) after it, without beating it anywhere?
+def _unimodal(seen, best):
+    ks = sorted(seen)
+    peak = seen[best]
+    for k1, k2 in zip(ks, ks[1:]):
+        if seen[k2] > peak:
+            return False
+        if k2 <= best and seen[k2] < seen[k1]:
+            return False
+        if k1 >= best and seen[k2] > seen[k1]:
+            return False
+    return True
+
+# Wrap an expensive profit function so that each price is only worked
+# out once.  Prices are rounded to whole cents, and the function is
+# called with that rounded price, so 2.919999 and 2.92 share one entry.
+#
+#    profit = CachedProfit(simulate, path='profits.json')
+#    best_price(1.0, 10.0, 0.01, profit)
+#    best_price(2.0, 4.0, 0.01, profit)     # all hits
+#    profit.save()                          # reused by the next run
+#
+# At most maxsize prices are kept.  When it's full, the one that was
+# used longest ago is dropped.
+#
+# The saved file records which function the profits came from, and a
+# file made by a different one is ignored.  Only a plain module-level
+# function (or a functools.partial of one) can be told apart by its
+# module and name, so anything else (a lambda, a nested function, a
+# bound method, a compile_model() profit) needs its own key (a name, a
+# version, ProfitModel.key) to be saved.  Neither kind of key notices
+# that the function's code changed.
+class CachedProfit:
+    def __init__(self, profit_func, maxsize=100_000, path=None, key=None):
+        self.profit_func = profit_func
+        self.maxsize = maxsize
+        self.path = path
+        self.key = _function_key(profit_func) if key is None else key
+        if path is not None and self.key is None:
+            raise ValueError(f'pass a key to save the profits of {profit_func!r}')
+        self.cache = OrderedDict()     # cents -> profit, oldest first
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if isinstance(saved, dict) and saved.get('key') == self.key:
+                for cents, profit in saved['profits']:
+                    self._store(cents, profit)
+
+    def __call__(self, price):
+        cents = round(price * 100)
+        try:
+            profit = self.cache[cents]
+        except KeyError:
+            self.misses += 1
+            profit = self.profit_func(cents / 100)
+            self._store(cents, profit)
+        else:
+            self.hits += 1
+            self.cache.move_to_end(cents)
+        return profit
+
+    def _store(self, cents, profit):
+        self.cache[cents] = profit
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = self.misses = 0
+
+    # Write the cache to path.  Goes through a temporary file so a crash
+    # halfway doesn't leave a broken cache behind.
+    def save(self):
+        if self.path is None:
+            raise ValueError('no path to save the profit cache to')
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'key': self.key, 'profits': list(self.cache.items())}, f)
+        os.replace(tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        if self.path is not None:
+            self.save()
+
+# The module and name of a module-level function, or None if func
+# isn't one (or a partial of one)
+def _function_key(func):
+    if isinstance(func, functools.partial):
+        key = _function_key(func.func)
+        return key and f'{key}{func.args!r}{sorted(func.keywords.items())!r}'
+    module = sys.modules.get(getattr(func, '__module__', None))
+    name = getattr(func, '__qualname__', None)
+    if module is None or name is None or getattr(module, name, None) is not func:
+        return None
+    return f'{func.__module__}.{name}'
+
+def compute_profit(price, fixed_cost=FIXED_COST, variable_cost=VARIABLE_COST,
+                   base_price=BASE_PRICE, base_attendance=BASE_ATTENDANCE,
+                   attendance_change=ATTENDANCE_CHANGE, price_step=PRICE_STEP):
+    attendees = expected_attendees(price, base_price, base_attendance,
+                                   attendance_change, price_step)
     revenue = expected_revenue(attendees, price)
     #revenue = attendees * price
     #revenue = expected_revenue()
-    cost = expected_cost(attendees)
+    cost = expected_cost(attendees, fixed_cost, variable_cost)
     return revenue - cost
 
 def expected_revenue(attendees, price):
     return attendees * price
 
-def expected_cost(attendees):
-    return 180 + 0.04 * attendees
+def expected_cost(attendees, fixed_cost=FIXED_COST, variable_cost=VARIABLE_COST):
+    return fixed_cost + variable_cost * attendees
+
+def expected_attendees(price, base_price=BASE_PRICE, base_attendance=BASE_ATTENDANCE,
+                       attendance_change=ATTENDANCE_CHANGE, price_step=PRICE_STEP):
+    return base_attendance - (price - base_price) * (attendance_change / price_step)
+
+# The same model in whole cents.  The attendance for a price can be a
+# fraction of a person (at $5.05 it's 112.5), so everything is kept
+# multiplied by the price step in cents to stay an integer.  The result
+# is the profit in cents times step_cents: not the profit itself, but it
+# orders prices exactly the same way.  Divide by 100 * step_cents for
+# dollars.  Works on integer NumPy arrays too.
+FIXED_COST_CENTS    = cents(FIXED_COST)
+VARIABLE_COST_CENTS = cents(VARIABLE_COST)
+BASE_PRICE_CENTS    = cents(BASE_PRICE)
+PRICE_STEP_CENTS    = cents(PRICE_STEP)
+
+@cents_profit
+def compute_profit_cents(price, fixed_cents=FIXED_COST_CENTS, variable_cents=VARIABLE_COST_CENTS,
+                         base_cents=BASE_PRICE_CENTS, base_attendance=BASE_ATTENDANCE,
+                         attendance_change=ATTENDANCE_CHANGE, step_cents=PRICE_STEP_CENTS):
+    # attendees * step_cents
+    attendees = base_attendance * step_cents - (price - base_cents) * attendance_change
+    return attendees * (price - variable_cents) - fixed_cents * step_cents
+
+# Several shows (say matinee, evening and weekend), each with its own
+# price.  Each show's attendance follows expected_attendees() from its
+# own base attendance.  A CROSS_ELASTICITY share of the people a show
+# loses that way (or gains, if it's cheap) try another show instead,
+# and they're as put off by its price as its own audience is.  All the
+# shows together can't sell more than CAPACITY seats; past that, every
+# show is cut back in proportion.
+SHOW_DEMAND      = (90, 120, 150)
+CROSS_ELASTICITY = 0.2
+CAPACITY         = 300
+
+def compute_show_profit(prices, demand=SHOW_DEMAND, cross=CROSS_ELASTICITY, capacity=CAPACITY):
+    if len(prices) != len(demand):
+        raise ValueError(f'{len(prices)} prices for {len(demand)} shows')
+    alone = [max(0.0, expected_attendees(p, base_attendance=d)) for p, d in zip(prices, demand)]
+    lost = [d - a for d, a in zip(demand, alone)]
+    others = max(len(prices) - 1, 1)
+    attendees = [a + cross * (sum(lost) - l) / others * (a / d)
+                 for a, l, d in zip(alone, lost, demand)]
+    total = sum(attendees)
+    if total > capacity:
+        attendees = [a * capacity / total for a in attendees]
+    return sum(expected_revenue(a, p) - expected_cost(a) for a, p in zip(attendees, prices))
+
+# best_price() for a list of prices.  profit_func takes a tuple of
+# prices.  The whole grid is far too big to try (91 prices per show
+# from $1 to $10 is 6 billion combinations for five shows), so this
+# searches coarse to fine:
+#
+#   1. Try a coarse grid, about 'points' prices per variable.
+#   2. Around the best one, try a grid twice as fine that reaches one
+#      coarse step either way: 5 prices per variable.  Repeat down to
+#      'increment'.
+#   3. Move one price at a time by one increment while that helps.
+#
+# Like best_price_golden() this assumes one peak; a function with
+# several can fool it.  Prices are low + k*increment for integer k, and
+# no combination is evaluated twice.
+#
+#    >>> best_prices((1.0, 1.0, 1.0), (10.0, 10.0, 10.0), 0.10, compute_show_profit)
+#    (4.9, 5.2, 5.4)
+def best_prices(low_prices, high_prices, increment, profit_func, points=8):
+    counts = [int(math.floor((high - low) / increment + 1e-9)) + 1
+              for low, high in zip(low_prices, high_prices)]
+    seen = { }
+    def profit(ks):
+        if ks not in seen:
+            seen[ks] = profit_func(tuple(low + k * increment for low, k in zip(low_prices, ks)))
+        return seen[ks]
+
+    step = 1
+    while max(counts) > step * points:
+        step *= 2
+    lows = [0] * len(counts)
+    highs = [count - 1 for count in counts]
+    best = None
+    while True:
+        axes = [sorted(set(range(lo, hi + 1, step)) | {hi}) for lo, hi in zip(lows, highs)]
+        for ks in itertools.product(*axes):
+            if best is None or profit(ks) > profit(best):
+                best = ks
+        if step == 1:
+            break
+        lows = [max(k - step, 0) for k in best]
+        highs = [min(k + step, count - 1) for k, count in zip(best, counts)]
+        step //= 2
+
+    improved = True
+    while improved:
+        improved = False
+        for i, count in enumerate(counts):
+            for move in (-1, 1):
+                k = best[i] + move
+                if 0 <= k < count:
+                    ks = best[:i] + (k,) + best[i + 1:]
+                    if profit(ks) > profit(best):
+                        best = ks
+                        improved = True
+    return tuple(low + k * increment for low, k in zip(low_prices, best))
+
+# A demand model learned from observations instead of fixed constants.
+# Every (price, attendees) observation updates a least-squares line
+# through them in O(1) (running means and sums of squares, updated
+# Welford-style so they stay accurate over long runs), with no history
+# kept.  profit() plugs the line into compute_profit().
+#
+#    model = DemandModel()
+#    for price, attendees in observations:
+#        model.observe(price, attendees)
+#        price = model.recommended_price()
+#
+# recommended_price() is cached.  It only searches again when the slope
+# or intercept has moved by more than 'tolerance' (relative) since the
+# last search, so most observations cost nothing more than the update.
+class DemandModel:
+    def __init__(self, tolerance=0.01, low_price=LOW_PRICE, high_price=HIGH_PRICE,
+                 increment=INCREMENT):
+        self.tolerance = tolerance
+        self.low_price = low_price
+        self.high_price = high_price
+        self.increment = increment
+        self.count = 0
+        self.mean_price = 0.0
+        self.mean_attendees = 0.0
+        self.price_squares = 0.0      # sum of (price - mean_price)**2
+        self.products = 0.0           # sum of (price - mean_price)*(attendees - mean_attendees)
+        self.optimizations = 0
+        self._fitted = None           # (slope, intercept) of the last search
+        self._price = None
+
+    def observe(self, price, attendees):
+        self.count += 1
+        dp = price - self.mean_price
+        self.mean_price += dp / self.count
+        self.mean_attendees += (attendees - self.mean_attendees) / self.count
+        self.price_squares += dp * (price - self.mean_price)
+        self.products += dp * (attendees - self.mean_attendees)
+
+    @property
+    def slope(self):
+        if self.price_squares <= 0:
+            raise ValueError('need observations at two different prices')
+        return self.products / self.price_squares
+
+    @property
+    def intercept(self):
+        return self.mean_attendees - self.slope * self.mean_price
+
+    def parameters(self):
+        # The line in compute_profit()'s terms, anchored at the mean price
+        return dict(base_price=self.mean_price, base_attendance=self.mean_attendees,
+                    attendance_change=-self.slope * PRICE_STEP, price_step=PRICE_STEP)
+
+    def profit(self, price):
+        return compute_profit(price, **self.parameters())
+
+    def _moved(self, old, new):
+        return abs(new - old) > self.tolerance * abs(old)
+
+    def recommended_price(self):
+        fitted = (self.slope, self.intercept)
+        if self._fitted is None or any(map(self._moved, self._fitted, fitted)):
+            profit = functools.partial(compute_profit, **self.parameters())
+            self._price = best_price(self.low_price, self.high_price, self.increment, profit,
+                                     strategy='golden')
+            self._fitted = fitted
+            self.optimizations += 1
+        return self._price
+
+# Monte Carlo.  Attendance is never exactly expected_attendees(): here
+# it's that plus normal noise with a standard deviation of 'noise'
+# people (and never below zero).  simulate() runs 'trials' shows at
+# every price and summarizes the profits per price:
+#
+#    >>> sim = ProfitSimulation(trials=10000, noise=20)
+#    >>> stats = sim.simulate(numpy.array([2.5, 2.9, 3.5]))
+#    >>> stats['mean'], stats['quantiles'], stats['ci']
+#
+# Used as a profit function it gives the risk-adjusted profit, the mean
+# minus 'risk' standard deviations, for every price in an array:
+#
+#    >>> best_price(1.0, 10.0, 0.10, sim, vectorized=True)
+#
+# The samples are drawn as a (prices x trials) array, in blocks of
+# whole rows so that no more than max_samples of them exist at once.  A
+# row longer than that is drawn max_samples trials at a time, and the
+# mean and standard deviation are added up as it goes; the quantiles
+# need the whole row, so simulate() refuses them then (the risk-adjusted
+# profit doesn't use them).  Peak memory is about 32 bytes per sample
+# (the arrays for the noise, profit and the sums, or the sorting for the
+# quantiles), so 64MB at the default.
+#
+# Each price has its own random stream, seeded from 'seed' and the
+# exact bits of the price (so 2.9001 and 2.9002 get different noise),
+# and the results don't depend on the block size or on which other
+# prices are simulated alongside it.  That costs a new generator for
+# every price, about 20us: with few trials per price it's most of the
+# time (10**5 prices x 100 trials takes several times as long as one
+# price x 10**7 trials).
+MAX_SAMPLES = 2_000_000
+
+class ProfitSimulation:
+    def __init__(self, trials=10_000, noise=10.0, seed=0, risk=1.0,
+                 quantiles=(0.05, 0.5, 0.95), confidence=0.95, max_samples=MAX_SAMPLES):
+        self.trials = trials
+        self.noise = noise
+        self.seed = seed
+        self.risk = risk
+        self.quantiles = quantiles
+        self.confidence = confidence
+        self.max_samples = max_samples
+
+    # The profits of every trial, as (start, stop, first, profits)
+    # blocks where profits[i, j] is trial first + j for prices[start + i]
+    def blocks(self, prices):
+        import numpy as np
+        prices = np.atleast_1d(np.asarray(prices, dtype=float))
+        rows = max(1, self.max_samples // self.trials)
+        chunk = min(self.trials, self.max_samples)
+        for start in range(0, len(prices), rows):
+            block = prices[start:start + rows]
+            streams = [np.random.default_rng(np.random.SeedSequence([self.seed, int(bits)]))
+                       for bits in block.view(np.uint64)]
+            for first in range(0, self.trials, chunk):
+                noise = np.empty((len(block), min(chunk, self.trials - first)))
+                for row, stream in zip(noise, streams):
+                    stream.standard_normal(out=row)
+                # Reuse the noise array for the attendance
+                attendees = noise
+                attendees *= self.noise
+                attendees += expected_attendees(block[:, None])
+                np.maximum(attendees, 0, out=attendees)
+                yield start, start + len(block), first, (expected_revenue(attendees, block[:, None])
+                                                         - expected_cost(attendees))
+
+    def simulate(self, prices):
+        return self._summarize(prices, self.quantiles)
+
+    def _summarize(self, prices, quantiles):
+        import numpy as np
+        from statistics import NormalDist
+        if quantiles and self.trials > self.max_samples:
+            raise ValueError(f'quantiles need all {self.trials} trials of a price at once, '
+                             f'but max_samples is {self.max_samples}')
+        count = len(np.atleast_1d(prices))
+        mean = np.empty(count)
+        squares = np.empty(count)     # sum of (profit - mean)**2
+        quantile_values = np.empty((count, len(quantiles)))
+        for start, stop, first, profits in self.blocks(prices):
+            trials = profits.shape[1]
+            block_mean = profits.mean(axis=1)
+            block_squares = profits.var(axis=1) * trials
+            if first == 0:
+                mean[start:stop] = block_mean
+                squares[start:stop] = block_squares
+            else:
+                # Chan et al.'s update for two sets of samples
+                delta = block_mean - mean[start:stop]
+                total = first + trials
+                mean[start:stop] += delta * (trials / total)
+                squares[start:stop] += block_squares + delta**2 * (first * trials / total)
+            if quantiles:
+                quantile_values[start:stop] = np.quantile(profits, quantiles, axis=1).T
+        std = np.sqrt(squares / (self.trials - 1)) if self.trials > 1 else np.zeros(count)
+        # Confidence interval for the mean profit
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        margin = z * std / np.sqrt(self.trials)
+        return {
+            'mean': mean,
+            'std': std,
+            'quantiles': quantile_values,
+            'ci': np.stack([mean - margin, mean + margin], axis=1),
+        }
+
+    def __call__(self, prices):
+        stats = self._summarize(prices, ())
+        return stats['mean'] - self.risk * stats['std']
+
+# Profit models written down as data instead of code.  A spec gives
+# default values for some named parameters and three formulas (Python
+# expressions) for attendance, revenue and cost.  The formulas can use
+# 'price', the parameters, the formulas before them, numbers, + - * / **
+# and the functions in MODEL_FUNCTIONS.  The theater above is:
+#
+#    THEATER_MODEL = {
+#        'parameters': {'fixed_cost': 180, 'variable_cost': 0.04, ...},
+#        'attendance': 'base_attendance - (price - base_price) * (attendance_change / price_step)',
+#        'revenue': 'attendance * price',
+#        'cost': 'fixed_cost + variable_cost * attendance',
+#    }
+#
+# compile_model() turns a spec into a ProfitModel with two functions of
+# (price, **parameters) that return revenue - cost: 'profit' for single
+# prices and 'vectorized' for NumPy arrays, ready for best_price():
+#
+#    >>> model = compile_model(THEATER_MODEL)
+#    >>> best_price(1.0, 10.0, 0.10, model.vectorized, vectorized=True)
+#    2.9000000000000004
+#
+# Compiled models are cached by a hash of the spec, so compiling the
+# same spec again is free.
+MODEL_FORMULAS = ('attendance', 'revenue', 'cost')
+
+# Functions a formula may call, and what they are with NumPy
+MODEL_FUNCTIONS = {
+    'min': (min, 'minimum'),
+    'max': (max, 'maximum'),
+    'abs': (abs, 'abs'),
+    'sqrt': (math.sqrt, 'sqrt'),
+    'exp': (math.exp, 'exp'),
+    'log': (math.log, 'log'),
+}
+
+_MODEL_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+                ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+THEATER_MODEL = {
+    'parameters': {
+        'fixed_cost': FIXED_COST,
+        'variable_cost': VARIABLE_COST,
+        'base_price': BASE_PRICE,
+        'base_attendance': BASE_ATTENDANCE,
+        'attendance_change': ATTENDANCE_CHANGE,
+        'price_step': PRICE_STEP,
+    },
+    'attendance': 'base_attendance - (price - base_price) * (attendance_change / price_step)',
+    'revenue': 'attendance * price',
+    'cost': 'fixed_cost + variable_cost * attendance',
+}
+
+class ProfitModel:
+    def __init__(self, spec, key, source):
+        self.spec = spec
+        self.key = key
+        self.source = source          # Python code for the profit function
+        self.profit = self._build({ name: func for name, (func, _) in MODEL_FUNCTIONS.items() })
+        self._vectorized = None
+
+    def _build(self, functions):
+        namespace = dict(functions)
+        exec(compile(self.source, f'<profit model {self.key[:12]}>', 'exec'), namespace)
+        return namespace['profit']
+
+    # Built on first use, so that models without NumPy still work
+    @property
+    def vectorized(self):
+        if self._vectorized is None:
+            import numpy as np
+            self._vectorized = self._build({ name: getattr(np, npname)
+                                             for name, (_, npname) in MODEL_FUNCTIONS.items() })
+        return self._vectorized
+
+_models = { }
+
+def compile_model(spec):
+    key = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+    model = _models.get(key)
+    if model is None:
+        model = _models[key] = ProfitModel(spec, key, _model_source(spec))
+    return model
+
+def _model_source(spec):
+    parameters = spec.get('parameters', { })
+    unknown = set(spec) - set(MODEL_FORMULAS) - {'parameters'}
+    if unknown:
+        raise ValueError(f'unknown model entries {sorted(unknown)}')
+    for name, value in parameters.items():
+        if not name.isidentifier() or keyword.iskeyword(name) or name in MODEL_FORMULAS \
+           or name in MODEL_FUNCTIONS or name == 'price':
+            raise ValueError(f'bad parameter name {name!r}')
+        if not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f'parameter {name!r} must be a finite number')
+
+    # Keyword-only, so that specs that differ only in the order of their
+    # parameters (and share one cached model) take them the same way
+    args = ''.join(f', {name}={value!r}' for name, value in parameters.items())
+    lines = [f'def profit(price{", *" + args if args else ""}):']
+    known = {'price'} | set(parameters)
+    for formula in MODEL_FORMULAS:
+        if formula not in spec:
+            raise ValueError(f'model has no {formula!r} formula')
+        lines.append(f'    {formula} = {_check_formula(formula, spec[formula], known)}')
+        known.add(formula)
+    lines.append('    return revenue - cost')
+    return '\n'.join(lines) + '\n'
+
+# Parse one formula, allowing only arithmetic on known names and calls
+# to MODEL_FUNCTIONS.  Returns it as clean Python source.
+def _check_formula(formula, text, known):
+    try:
+        tree = ast.parse(text, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f'{formula}: {e.msg}') from None
+    called = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _MODEL_NODES):
+            raise ValueError(f'{formula}: {type(node).__name__} is not allowed')
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f'{formula}: only numbers are allowed')
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in MODEL_FUNCTIONS:
+                raise ValueError(f'{formula}: unknown function {ast.unparse(node.func)}')
+            if node.keywords:
+                raise ValueError(f'{formula}: {node.func.id}() takes no keyword arguments')
+            if node.func.id in _MODEL_FOLDED:
+                if len(node.args) < 2:
+                    raise ValueError(f'{formula}: {node.func.id}() needs at least 2 arguments')
+            elif len(node.args) != 1:
+                raise ValueError(f'{formula}: {node.func.id}() takes 1 argument')
+            called.add(node.func)
+        elif isinstance(node, ast.Name) and node not in called and node.id not in known:
+            raise ValueError(f'{formula}: unknown name {node.id!r}')
+    return ast.unparse(_FoldCalls().visit(tree))
+
+# min() and max() take any number of arguments, but np.minimum() and
+# np.maximum() take two (a third is where to put the result).  So
+# min(a, b, c) is written as min(min(a, b), c) for both versions.
+_MODEL_FOLDED = {'min', 'max'}
+
+class _FoldCalls(ast.NodeTransformer):
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if node.func.id not in _MODEL_FOLDED:
+            return node
+        folded = node.args[0]
+        for arg in node.args[1:]:
+            folded = ast.Call(func=ast.Name(id=node.func.id, ctx=ast.Load()),
+                              args=[folded, arg], keywords=[])
+        return folded
+
+# Sensitivity analysis: how do the best price and profit change when
+# the constants change?  grid gives a list of values to try for some of
+# the PARAMETERS, and every combination of them is a scenario:
+#
+#    >>> rows = sensitivity({'fixed_cost': [150, 180, 210], 'variable_cost': [0.02, 0.04]})
+#    >>> rows[0]
+#    (150, 0.02, 2.9000000000000004, 1102.8)
+#
+# Each row is the scenario's values (in the order of grid) followed by
+# the best price and its profit.  Parameters not in grid keep their
+# usual values.  Scenarios are spread over a pool of worker processes
+# (workers=1 runs them here instead), many per message.
+def sensitivity(grid, low_price=LOW_PRICE, high_price=HIGH_PRICE, increment=INCREMENT,
+                workers=None, vectorized=True):
+    for name in grid:
+        if name not in PARAMETERS:
+            raise ValueError(f'unknown parameter {name!r}')
+    names = tuple(grid)
+    scenarios = list(itertools.product(*grid.values()))
+    solve = functools.partial(_solve_scenario, names, low_price, high_price, increment, vectorized)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(scenarios) < 2:
+        results = map(solve, scenarios)
+    else:
+        chunksize = max(1, len(scenarios) // (4 * workers))
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(solve, scenarios, chunksize=chunksize))
+    return [values + result for values, result in zip(scenarios, results)]
+
+def _solve_scenario(names, low_price, high_price, increment, vectorized, values):
+    profit_func = functools.partial(compute_profit, **dict(zip(names, values)))
+    price = best_price(low_price, high_price, increment, profit_func, vectorized=vectorized)
+    return price, float(profit_func(price))
+
+def print_table(names, rows):
+    print(' '.join('%12s' % name[:12] for name in names), '%12s %12s' % ('best price', 'profit'))
+    for row in rows:
+        print(' '.join('%12g' % value for value in row))
+
+# Self-checks, run on import like the ones in ../1_fracs.  The NumPy
+# parts are skipped when NumPy isn't installed.
+def _have_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return False
+    return True
+
+def test_vectorized():
+    global CHUNK
+    if not _have_numpy():
+        return
+    import numpy as np
+    assert best_price(1.0, 10.0, 0.10, compute_profit, vectorized=True) == 1.0 + 19 * 0.10
+    for increment in (0.01, 0.001):
+        count = round(9.0 / increment) + 1
+        k = max(range(count), key=lambda k: (compute_profit(1.0 + k * increment), -k))
+        assert best_price(1.0, 10.0, increment, compute_profit, vectorized=True) == \
+            1.0 + k * increment
+
+    # Across chunks, and the first of equal profits wins
+    saved = CHUNK
+    CHUNK = 7
+    try:
+        assert best_price(1.0, 10.0, 0.10, compute_profit, vectorized=True) == 1.0 + 19 * 0.10
+        assert best_price(1.0, 10.0, 0.10, lambda p: np.zeros(len(p)), vectorized=True) == 1.0
+        assert best_price(1.0, 10.0, 0.10, lambda p: np.minimum(p, 5.0), vectorized=True) == \
+            1.0 + 40 * 0.10
+    finally:
+        CHUNK = saved
+    print('Good vectorized prices')
+
+test_vectorized()
+
+def test_golden():
+    calls = []
+    def counted(price):
+        calls.append(price)
+        return compute_profit(price)
+    for increment, most in ((0.10, 15), (0.01, 25), (0.0001, 40)):
+        calls.clear()
+        count = round(9.0 / increment) + 1
+        k = max(range(count), key=lambda k: (compute_profit(1.0 + k * increment), -k))
+        assert best_price(1.0, 10.0, increment, counted, strategy='golden') == 1.0 + k * increment
+        assert len(calls) <= most and len(set(calls)) == len(calls)
+
+    # Two peaks: the check fails and every price gets looked at
+    wavy = lambda p: calls.append(p) or p * math.sin(3 * p)
+    calls.clear()
+    k = max(range(91), key=lambda k: (wavy(1.0 + k * 0.10), -k))
+    calls.clear()
+    assert best_price(1.0, 10.0, 0.10, wavy, strategy='golden') == 1.0 + k * 0.10
+    assert len(calls) == 91
+
+    # Peaks with flat stretches either side, and on top
+    import random
+    rand = random.Random(3)
+    for _ in range(2000):
+        n = rand.randint(1, 80)
+        top = rand.randint(0, n - 1)
+        up = list(itertools.accumulate(rand.choice((0, 0, 1, 2)) for _ in range(top + 1)))
+        down = list(itertools.accumulate(rand.choice((0, 0, 1, 2)) for _ in range(n - top - 1)))
+        values = up + [up[-1] - d for d in down]
+        k = best_price_golden(0, n - 1, 1, lambda p: values[p])
+        assert k == max(range(n), key=lambda k: (values[k], -k))
+
+    try:
+        best_price(1.0, 10.0, 0.10, compute_profit, strategy='newton')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print('Good golden section search')
+
+test_golden()
+
+def test_cache():
+    calls = []
+    def counted(price):
+        calls.append(price)
+        return compute_profit(price)
+    cached = CachedProfit(counted)
+    assert round(best_price(1.0, 10.0, 0.01, cached) * 100) == 292
+    assert round(best_price(2.0, 4.0, 0.01, cached) * 100) == 292
+    assert cached.misses == len(calls) == len(cached) and cached.hits > 200
+    assert cached(2.919999) == cached(2.92) == compute_profit(2.92)
+
+    small = CachedProfit(compute_profit, maxsize=3)
+    for price in (1.0, 1.01, 1.02, 1.0, 1.03):
+        small(price)
+    assert list(small.cache) == [102, 100, 103]
+    assert (small.hits, small.misses) == (1, 4)
+
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'profits.json')
+        with CachedProfit(compute_profit, path=path) as saved:
+            saved(2.9)
+        again = CachedProfit(compute_profit, path=path)
+        assert again(2.9) == compute_profit(2.9) and again.hits == 1
+
+        # Different function, different parameters, different key: no reuse
+        assert CachedProfit(lambda x: -x, path=path, key='negate')(2.9) == -2.9
+        other = CachedProfit(functools.partial(compute_profit, fixed_cost=0), path=path)
+        assert other(2.9) == compute_profit(2.9, fixed_cost=0) and other.misses == 1
+        assert len(CachedProfit(compute_profit, path=path, key='v2')) == 0
+
+        # Functions that can't be told apart by name need a key to be saved
+        free = dict(THEATER_MODEL, cost='0')
+        for func in (lambda x: x, counted, DemandModel().profit,
+                     compile_model(THEATER_MODEL).profit, compile_model(free).profit):
+            try:
+                CachedProfit(func, path=path)
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+        model, free = compile_model(THEATER_MODEL), compile_model(free)
+        with CachedProfit(model.profit, path=path, key=model.key) as saved:
+            saved(2.9)
+        assert CachedProfit(free.profit, path=path, key=free.key)(2.9) == free.profit(2.9)
+    print('Good profit cache')
+
+test_cache()
+
+def test_sensitivity():
+    grid = {'fixed_cost': [150, 180], 'attendance_change': [15, 30], 'base_price': [5.0]}
+    vectorized = _have_numpy()
+    rows = sensitivity(grid, workers=1, vectorized=vectorized)
+    assert [row[:3] for row in rows] == list(itertools.product(*grid.values()))
+    for fixed, change, base, price, profit in rows:
+        params = dict(fixed_cost=fixed, attendance_change=change, base_price=base)
+        expected = best_price(LOW_PRICE, HIGH_PRICE, INCREMENT,
+                              functools.partial(compute_profit, **params), vectorized=vectorized)
+        assert price == expected
+        assert profit == compute_profit(price, **params)
+    # Fixed cost moves the profit, not the price
+    assert rows[0][3] == rows[2][3] and rows[0][4] - rows[2][4] == 30
+    assert rows[0][3] > rows[1][3]
+
+    try:
+        sensitivity({'rent': [1, 2]}, workers=1)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print('Good sensitivity sweep')
+
+test_sensitivity()
+
+def test_exact():
+    from fractions import Fraction
+    def true_profit(c):
+        price = Fraction(c, 100)
+        attendees = BASE_ATTENDANCE - (price - Fraction(BASE_PRICE)) * ATTENDANCE_CHANGE / Fraction(1, 10)
+        return attendees * (price - Fraction(4, 100)) - FIXED_COST
+    modes = [{}, {'strategy': 'golden'}]
+    if _have_numpy():
+        modes.append({'vectorized': True})
+    for increment in ('0.01', '0.05', '0.10', '0.25'):
+        step = cents(increment)
+        best = max(range(100, 1001, step), key=lambda c: (true_profit(c), -c))
+        for mode in modes:
+            price = best_price(1.0, 10.0, increment, compute_profit_cents, exact=True, **mode)
+            assert price == Decimal(best).scaleb(-2)
+    for c in (100, 290, 505, 1000):
+        assert Fraction(compute_profit_cents(c), 100 * PRICE_STEP_CENTS) == true_profit(c)
+    assert best_price(1.0, 10.0, 0.10, functools.partial(compute_profit_cents, fixed_cents=0),
+                      exact=True) == Decimal('2.90')
+
+    # A profit function in dollars, and prices that aren't whole cents
+    for args in ((1.0, 10.0, 0.10, compute_profit), (1.0, 10.0, 0.001, compute_profit_cents)):
+        try:
+            best_price(*args, exact=True)
+            assert False, "expected an error"
+        except (TypeError, ValueError):
+            pass
+    print('Good exact prices')
+
+test_exact()
+
+def test_best_prices():
+    # Against every combination (three shows on a coarser grid to keep
+    # this quick)
+    for demand, capacity, increment in (((90, 120, 150), 300, 0.25), ((60, 200), 200, 0.10),
+                                        ((100, 100), 150, 0.10), ((50, 250), 1000, 0.10)):
+        grid = [1.0 + k * increment for k in range(round(9.0 / increment) + 1)]
+        profit = functools.partial(compute_show_profit, demand=demand, capacity=capacity)
+        found = best_prices((1.0,) * len(demand), (10.0,) * len(demand), increment, profit)
+        assert profit(found) == max(map(profit, itertools.product(grid, repeat=len(demand))))
+
+    # One variable is just best_price()
+    assert best_prices((1.0,), (10.0,), 0.10, lambda ps: compute_profit(ps[0])) == (1.0 + 19 * 0.10,)
+
+    try:
+        compute_show_profit((3.0,) * 5)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print('Good multi-price search')
+
+test_best_prices()
+
+def test_demand_model():
+    import random
+    import statistics
+    rand = random.Random(1)
+    prices = [rand.uniform(3, 7) for _ in range(1000)]
+    attendance = [expected_attendees(p) + rand.gauss(0, 3) for p in prices]
+    model = DemandModel()
+    try:
+        model.observe(prices[0], attendance[0])
+        model.slope
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    for p, a in zip(prices[1:], attendance[1:]):
+        model.observe(p, a)
+    slope, intercept = statistics.linear_regression(prices, attendance)
+    assert math.isclose(model.slope, slope) and math.isclose(model.intercept, intercept)
+    assert math.isclose(model.profit(2.9), compute_profit(2.9, **model.parameters()))
+
+    # Observations on the true line: one search, then cached answers
+    model = DemandModel()
+    for p in (4.0, 6.0):
+        model.observe(p, expected_attendees(p))
+    assert round(model.recommended_price() * 100) == 290
+    for p in (2.5, 3.0, 3.5) * 10:
+        model.observe(p, expected_attendees(p))
+        assert round(model.recommended_price() * 100) == 290
+    assert model.optimizations == 1
+
+    # Demand shifts: searched again, once it's moved far enough
+    for _ in range(50):
+        model.observe(3.0, expected_attendees(3.0, attendance_change=30))
+        model.observe(4.0, expected_attendees(4.0, attendance_change=30))
+        model.recommended_price()
+    assert 1 < model.optimizations < 50
+    print('Good demand model')
+
+test_demand_model()
+
+def test_simulation():
+    if not _have_numpy():
+        return
+    import numpy as np
+    prices = np.array([2.5, 2.9, 3.5])
+    sim = ProfitSimulation(trials=4000, noise=20)
+    stats = sim.simulate(prices)
+    expected = compute_profit(prices)
+    assert np.all(np.abs(stats['mean'] - expected) < 5 * stats['std'] / np.sqrt(4000))
+    assert np.all(stats['ci'][:, 0] < stats['mean']) and np.all(stats['mean'] < stats['ci'][:, 1])
+    assert np.all(np.diff(stats['quantiles'], axis=1) > 0)
+
+    # Same numbers whatever the block size or the other prices
+    small = ProfitSimulation(trials=4000, noise=20, max_samples=4000).simulate(prices[::-1])
+    assert np.array_equal(small['mean'], stats['mean'][::-1])
+    assert np.array_equal(ProfitSimulation(trials=4000, noise=20).simulate(prices[1:])['std'],
+                          stats['std'][1:])
+    # ... but different numbers for prices within a cent of each other
+    close = ProfitSimulation(trials=100, noise=20).simulate(np.array([2.901, 2.902]))
+    assert close['std'][0] != close['std'][1]
+
+    # Rows longer than max_samples are summed up a piece at a time
+    whole = ProfitSimulation(trials=10000, noise=20)
+    pieces = ProfitSimulation(trials=10000, noise=20, max_samples=3000)
+    assert np.allclose(pieces(prices), whole(prices), rtol=1e-12)
+    try:
+        pieces.simulate(prices)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    # The spread of profit grows with the price, so risk aversion picks
+    # a lower one
+    assert best_price(1.0, 10.0, 0.10, ProfitSimulation(trials=500), vectorized=True) == \
+        1.0 + 19 * 0.10
+    risky = ProfitSimulation(trials=500, noise=200, risk=2)
+    assert best_price(1.0, 10.0, 0.10, risky, vectorized=True) < 2.9
+    print('Good profit simulation')
+
+test_simulation()
+
+def test_model():
+    model = compile_model(THEATER_MODEL)
+    assert compile_model(json.loads(json.dumps(THEATER_MODEL))) is model
+    for price in (1.0, 2.9, 5.05, 10.0):
+        assert model.profit(price) == compute_profit(price)
+    assert model.profit(2.9, fixed_cost=100) == compute_profit(2.9, fixed_cost=100)
+    assert best_price(1.0, 10.0, 0.10, model.profit) == best_price(1.0, 10.0, 0.10, compute_profit)
+
+    spec = {
+        'parameters': {'a': 900, 'b': 150, 'cap': 400},
+        'attendance': 'max(min(a - b * price, cap, 500), 0)',
+        'revenue': 'attendance * price',
+        'cost': '180 + 0.04 * sqrt(attendance * attendance)',
+    }
+    capped = compile_model(spec)
+    assert 'min(min(' in capped.source
+    # Parameter order doesn't matter: same model, same way of calling it
+    reordered = compile_model({**spec, 'parameters': {'cap': 400, 'b': 150, 'a': 900}})
+    assert reordered is capped
+    assert capped.profit(3.0, b=100) == compile_model(dict(spec, parameters={
+        'a': 900, 'b': 100, 'cap': 400})).profit(3.0)
+    bare = compile_model({'attendance': '100 - price', 'revenue': 'attendance * price',
+                          'cost': '50'})
+    assert bare.profit(2.0) == 146
+    try:
+        capped.profit(3.0, 900)
+        assert False, "expected TypeError"
+    except TypeError:
+        pass
+    if _have_numpy():
+        import numpy as np
+        prices = 1.0 + np.arange(1000) * 0.01
+        assert np.array_equal(model.vectorized(prices), compute_profit(prices))
+        samples = np.array([0.5, 3.0, 7.0])
+        assert list(capped.vectorized(samples)) == [capped.profit(p) for p in samples]
+
+    for name, bad in [('cost', '__import__("os")'), ('cost', 'price.real'), ('cost', '[1]'),
+                      ('cost', 'foo + 1'), ('cost', 'lambda: 1'), ('cost', '"x"'),
+                      ('cost', 'max(x=1)'), ('cost', 'max + 1'), ('cost', 'max(a)'),
+                      ('cost', 'sqrt(a, b)'), ('cost', '1 +'), ('profit', 'a'),
+                      ('parameters', {'b': 150, 'cap': 400, 'a': float('inf')}),
+                      ('parameters', {'b': 150, 'cap': 400, 'a': float('nan')}),
+                      ('parameters', {'b': 150, 'cap': 400, 'a': '1'}),
+                      ('parameters', {'b': 150, 'cap': 400, 'a': 1, 'price': 1}),
+                      ('parameters', {'b': 150, 'cap': 400, 'a': 1, 'if': 1}),
+                      ('parameters', {'b': 150, 'cap': 400, 'a': 1, 'lambda': 1})]:
+        try:
+            compile_model({**spec, name: bad})
+            assert False, f"expected ValueError for {name} {bad!r}"
+        except ValueError:
+            pass
+    print('Good profit models')
 
-def expected_attendees(price):
-    return 120 - (price - 5.0) * (15/0.10)
+test_model()
 
 # **search** for the best price over some range
-best_price = best_price(1.0, 10.0, 0.10, compute_profit)
-print("Best price:", best_price)
+if __name__ == '__main__':
+    price = best_price(1.0, 10.0, 0.10, compute_profit)
+    print("Best price:", price)
+    print("Best price (vectorized):", best_price(1.0, 10.0, 0.10, compute_profit, vectorized=True))
+    print("Best price (golden):", best_price(1.0, 10.0, 0.10, compute_profit, strategy='golden'))
+    print("Best price (exact):", best_price(1.0, 10.0, 0.10, compute_profit_cents, exact=True))
+    print("Best show prices:", best_prices((1.0,) * 3, (10.0,) * 3, 0.10, compute_show_profit))
+    model = compile_model(THEATER_MODEL)
+    print("Best price (model):", best_price(1.0, 10.0, 0.10, model.vectorized, vectorized=True))
+    print()
+    grid = {'fixed_cost': [150, 180, 210], 'variable_cost': [0.02, 0.04, 0.06]}
+    print_table(list(grid), sensitivity(grid))
 
 
 
@@ -17,87 +17,535 @@
 # functionality. The old unit tests should still pass.
 # -----------------------------------------------------------------------------
 
+import itertools
+import math
+import operator
+import re
+import sys
+
 def gcd(a, b):
     while b: 
         a, b = b, a % b 
     return a
 
+# Fractions are created all the time, so the class uses __slots__:
+# there's no per-instance __dict__, just room for the two ints (and
+# the hash, once somebody asks for it).
+#
+# Small values such as 0, 1, 1/2 or 3/4 show up over and over again.
+# Since a Fraction can't be changed, there's no harm in handing out the
+# same instance every time.  Those are kept in a small cache (bounded
+# by SMALL_LIMIT on both the numerator and the denominator, and filled
+# in once after the class is defined).
+SMALL_LIMIT = 32
+_small_fractions = { }
+
 class Fraction:
-    def __init__(self, numerator, denominator):
-        #self.numerator = numerator
-        #self.denominator = denominator
-        d = gcd(numerator, denominator)
-        #self.numerator = numerator // d
-        #self.denominator = denominator // d
-
-        # use the __setattr__ on objects, bypassing
-        # the version of __setattr__ defined below
-        super().__setattr__('numerator', numerator // d)
-        super().__setattr__('denominator', denominator // d)
+    __slots__ = ('numerator', 'denominator', '_hash')
+
+    def __new__(cls, numerator, denominator):
+        if denominator == 0:
+            raise ZeroDivisionError(f'Fraction({numerator}, 0)')
+        # math.gcd() is the C version of gcd() above.  It's always
+        # positive, so flip it to move the sign into the numerator.
+        d = math.gcd(numerator, denominator)
+        if denominator < 0:
+            d = -d
+        numerator //= d
+        denominator //= d
+        if denominator <= SMALL_LIMIT and -SMALL_LIMIT <= numerator <= SMALL_LIMIT and cls is Fraction:
+            self = _small_fractions.get((numerator, denominator))
+            if self is not None:
+                return self
+
+        # set the slots directly, bypassing the version of
+        # __setattr__ defined below (see _set_numerator at the end)
+        self = object.__new__(cls)
+        _set_numerator(self, numerator)
+        _set_denominator(self, denominator)
+        return self
 
     def __setattr__(self, name, value):
         raise AttributeError("Attribute is immutable")
 
-    def __hash__(self): #TODO-in dictionary
-        return hash(self.numerator, self.denominator)
-    #
+    def __delattr__(self, name):
+        raise AttributeError("Attribute is immutable")
+
+    # No __dict__ and a __new__ that needs arguments, so tell pickle how
+    # to rebuild the object
+    def __reduce__(self):
+        return (Fraction, (self.numerator, self.denominator))
+
+    # Fractions that are equal to an int or a float must hash the same
+    # as them, or dictionaries get confused.  Python hashes every number
+    # as its value modulo the prime P = sys.hash_info.modulus, so n/d
+    # hashes as n * (inverse of d mod P).  This is the same recipe as
+    # the standard library's fractions.Fraction.  The modular inverse
+    # isn't cheap, so it's worked out once and kept in the _hash slot.
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        n, d = self.numerator, self.denominator
+        try:
+            dinv = pow(d, -1, _HASH_MODULUS)
+        except ValueError:
+            # d is a multiple of P, so there's no inverse
+            h = _HASH_INF
+        else:
+            h = hash(hash(abs(n)) * dinv)
+        h = h if n >= 0 else -h
+        if h == -1:
+            h = -2
+        _set_hash(self, h)
+        return h
+
+    # Arithmetic.  The results of these are always in lowest terms
+    # already, so they're built with _reduced() and skip the gcd that
+    # Fraction() would do.  Ints get their own fast paths (an int plus
+    # n/d is still over d, so there's nothing to reduce).  Other operands
+    # just need .numerator and .denominator.  See _add() and _mul() for
+    # the general case.
     def __add__(self, other):
-        return Fraction(numerator(self) * denominator(other) + denominator(self) * numerator(other) ,
-    denominator(self) * denominator(other) )
-    
+        if type(other) is int:
+            return _reduced(self.numerator + other * self.denominator, self.denominator)
+        try:
+            return _add(self.numerator, self.denominator, other.numerator, other.denominator)
+        except AttributeError:
+            return NotImplemented
+
     __radd__ = __add__
 
     def __sub__(self, other):
-        return Fraction(numerator(self) * denominator(other) - denominator(self) * numerator(other) 
-    , denominator(self) * denominator(other) )
-
+        if type(other) is int:
+            return _reduced(self.numerator - other * self.denominator, self.denominator)
+        try:
+            return _add(self.numerator, self.denominator, -other.numerator, other.denominator)
+        except AttributeError:
+            return NotImplemented
+
+    # other - self
     def __rsub__(self, other):
-        return Fraction(numerator(self) * denominator(other) - denominator(self) * numerator(other) 
-    , denominator(self) * denominator(other) )
+        if type(other) is int:
+            return _reduced(other * self.denominator - self.numerator, self.denominator)
+        try:
+            return _add(other.numerator, other.denominator, -self.numerator, self.denominator)
+        except AttributeError:
+            return NotImplemented
 
-    #
     def __mul__(self, other):
-        return Fraction(numerator(self) * numerator(other)  
-    , denominator(self) * denominator(other) )
-    
+        if type(other) is int:
+            g = math.gcd(other, self.denominator)
+            return _reduced(self.numerator * (other // g), self.denominator // g)
+        try:
+            return _mul(self.numerator, self.denominator, other.numerator, other.denominator)
+        except AttributeError:
+            return NotImplemented
+
     __rmul__ = __mul__
 
     def __truediv__(self, other):
-        return Fraction(numerator(self) * denominator(other)  
-    , denominator(self) * numerator(other) )
-
+        if type(other) is int:
+            if other == 0:
+                raise ZeroDivisionError('Fraction division by zero')
+            g = math.gcd(self.numerator, other)
+            if other < 0:
+                g = -g
+            return _reduced(self.numerator // g, self.denominator * (other // g))
+        try:
+            n, d = other.numerator, other.denominator
+        except AttributeError:
+            return NotImplemented
+        if n == 0:
+            raise ZeroDivisionError('Fraction division by zero')
+        if n < 0:
+            n, d = -n, -d
+        return _mul(self.numerator, self.denominator, d, n)
+
+    # other / self
     def __rtruediv__(self, other):
-        return Fraction(numerator(self) * denominator(other)  
-    , denominator(self) * numerator(other) )
-
-    def __lt__(self,other):
-        r = self.__sub__(other)
-        #
-        return r.numerator < 0
-
-        return (self.numerator * other.denominator < other.numerator * other.denominator)
- 
-    def __le__(self,other):
-        return (self.numerator * other.denominator <= other.numerator * other.denominator)
-    
+        n, d = self.numerator, self.denominator
+        if n == 0:
+            raise ZeroDivisionError('Fraction division by zero')
+        if n < 0:
+            n, d = -n, -d
+        if type(other) is int:
+            g = math.gcd(other, n)
+            return _reduced((other // g) * d, n // g)
+        try:
+            return _mul(other.numerator, other.denominator, d, n)
+        except AttributeError:
+            return NotImplemented
+
+    def __neg__(self):
+        return _reduced(-self.numerator, self.denominator)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self if self.numerator >= 0 else -self
+
+    # Comparisons.  These never build a new Fraction.  See _compare()
+    def __lt__(self, other):
+        order = _order(self, other)
+        return order if order is NotImplemented else order < 0
+
+    def __le__(self, other):
+        order = _order(self, other)
+        return order if order is NotImplemented else order <= 0
+
     def __gt__(self, other):
-        return (self.numerator * other.denominator > other.numerator * other.denominator)
-  
+        order = _order(self, other)
+        return order if order is NotImplemented else order > 0
+
     def __ge__(self, other):
-        return (self.numerator * other.denominator >= other.numerator * other.denominator)
-  
+        order = _order(self, other)
+        return order if order is NotImplemented else order >= 0
+
+    # Both sides are in lowest terms, so equal values have equal parts
     def __eq__(self, other):
-        return (self.numerator * other.denominator == other.numerator * other.denominator)
-  
+        parts = _parts(other)
+        if parts is None:
+            return NotImplemented
+        return self.numerator == parts[0] and self.denominator == parts[1]
+
     def __str__(self):
         if self.denominator == 1:
             return str(self.numerator)
         else:
             return f'{self.numerator}/{self.denominator}'
 
+    def __repr__(self):
+        return f'Fraction({self.numerator}, {self.denominator})'
+
+    # Dividing two ints gives the correctly rounded float, even when
+    # they're too big to be floats themselves
     def __float__(self):
-        return self.numeraotr / self.denominator
+        return self.numerator / self.denominator
+
+    # Truncates toward zero, like int() of a float
+    def __int__(self):
+        if self.numerator < 0:
+            return -(-self.numerator // self.denominator)
+        return self.numerator // self.denominator
+
+    # Digits after the point of abs(self) in the given base, one at a
+    # time, computed by long division.  The generator ends if the
+    # expansion does; otherwise it goes on forever.  Remainders are
+    # remembered (up to 'limit' of them) so that once the remainder
+    # repeats, the repeating block is just replayed from memory.
+    def digits(self, base=10, limit=None):
+        limit = limit or DIGIT_LIMIT
+        d = self.denominator
+        r = abs(self.numerator) % d
+        seen = { }
+        out = []
+        while r:
+            if len(out) < limit:
+                # Only replay a repeat that was remembered in full
+                start = seen.get(r)
+                if start is not None:
+                    cycle = out[start:]
+                    while True:
+                        yield from cycle
+                seen[r] = len(out)
+            digit, r = divmod(r * base, d)
+            if len(out) < limit:
+                out.append(digit)
+            yield digit
+
+    # The whole expansion as (integer part, digits before the repeat,
+    # repeating digits).  The repeating part is [] if the expansion ends,
+    # or None if it doesn't start repeating within 'limit' digits.
+    #
+    #    >>> Fraction(7, 6).expansion()
+    #    (1, [1], [6])
+    #    >>>
+    def expansion(self, base=10, limit=None):
+        limit = limit or DIGIT_LIMIT
+        d = self.denominator
+        whole, r = divmod(abs(self.numerator), d)
+        seen = { }
+        out = []
+        while r:
+            if r in seen:
+                return whole, out[:seen[r]], out[seen[r]:]
+            if len(out) >= limit:
+                return whole, out, None
+            seen[r] = len(out)
+            digit, r = divmod(r * base, d)
+            out.append(digit)
+        return whole, out, []
+
+    # format(f, '.3f') and friends.  Only the digits that are asked for
+    # get computed: the value is scaled by 10**precision and divided
+    # once, rounding half to even like float formatting does.  Without
+    # a type letter, it's formatted like str().  As with floats, the
+    # sign comes before any zero padding, and a negative value that
+    # rounds to zero keeps its sign ('-0.0').
+    def __format__(self, spec):
+        m = _FORMAT_SPEC.fullmatch(spec)
+        if m is None:
+            raise ValueError(f'Invalid format specifier {spec!r} for Fraction')
+        sign, zero, width, precision, kind = m.groups()
+        n, d = self.numerator, self.denominator
+        if not kind and precision is None:
+            text = str(abs(self))
+        else:
+            precision = 6 if precision is None else int(precision)
+            if kind == '%':
+                n *= 100
+            q, r = divmod(abs(n) * 10**precision, d)
+            if 2 * r > d or (2 * r == d and q % 2):
+                q += 1
+            text = str(q).rjust(precision + 1, '0')
+            if precision:
+                text = text[:-precision] + '.' + text[-precision:]
+            if kind == '%':
+                text += '%'
+        if n < 0:
+            prefix = '-'
+        else:
+            prefix = sign if sign in ('+', ' ') else ''
+        width = int(width) if width else 0
+        if zero:
+            return prefix + text.rjust(width - len(prefix), '0')
+        return (prefix + text).rjust(width)
+
+    # Bulk operations.  Adding up a long list with + reduces after every
+    # single term.  These defer the reduction (see Accumulator below).
+    @staticmethod
+    def sum(values, start=0):
+        acc = Accumulator(start)
+        acc.extend(values)
+        return acc.result()
+
+    @staticmethod
+    def prod(values, start=1, max_bits=None):
+        max_bits = max_bits or Accumulator.MAX_BITS
+        numer, denom = start.numerator, start.denominator
+        for value in values:
+            numer *= value.numerator
+            denom *= value.denominator
+            if denom.bit_length() > max_bits:
+                d = math.gcd(numer, denom)
+                numer //= d
+                denom //= d
+        return Fraction(numer, denom)
+
+
+# Most digits Fraction.digits()/expansion() will remember while looking
+# for the repeating part
+DIGIT_LIMIT = 100_000
+
+# [sign][0][width][.precision][type] for Fraction.__format__
+_FORMAT_SPEC = re.compile(r'([-+ ]?)(0?)(\d*)(?:\.(\d+))?([fF%]?)')
+
+# A Fraction from a numerator and denominator that are known to be in
+# lowest terms already (denominator positive).  No gcd needed.
+def _reduced(numerator, denominator):
+    if denominator <= SMALL_LIMIT and -SMALL_LIMIT <= numerator <= SMALL_LIMIT:
+        return _small_fractions[numerator, denominator]
+    self = object.__new__(Fraction)
+    _set_numerator(self, numerator)
+    _set_denominator(self, denominator)
+    return self
+
+# na/da + nb/db, both in lowest terms.  This is the trick from Knuth
+# (TAOCP vol 2, 4.5.1): with g = gcd(da, db), the sum is
+#
+#     t / (da/g * db)   where   t = na*(db/g) + nb*(da/g)
+#
+# and the only factors t can still share with the denominator are
+# factors of g.  So the gcd is taken with the small number g instead of
+# with the full product, and often g is 1 and there's nothing to do.
+def _add(na, da, nb, db):
+    if da == db:
+        if da == 1:
+            return _reduced(na + nb, 1)
+        t = na + nb
+        g = math.gcd(t, da)
+        return _reduced(t // g, da // g)
+    g = math.gcd(da, db)
+    if g == 1:
+        return _reduced(na * db + da * nb, da * db)
+    s = da // g
+    t = na * (db // g) + nb * s
+    g2 = math.gcd(t, g)
+    if g2 == 1:
+        return _reduced(t, s * db)
+    return _reduced(t // g2, s * (db // g2))
+
+# (na/da) * (nb/db), both in lowest terms and da, db positive.  Cancel
+# across before multiplying, so the products are already reduced.
+# Whole numbers have nothing to cancel.
+def _mul(na, da, nb, db):
+    if da == 1 and db == 1:
+        return _reduced(na * nb, 1)
+    g1 = math.gcd(na, db)
+    g2 = math.gcd(nb, da)
+    return _reduced((na // g1) * (nb // g2), (da // g2) * (db // g1))
+
+# (numerator, denominator) of anything that can be compared with a
+# Fraction, or None.  Ints (and other Fractions) have the attributes
+# already.  Finite floats are converted exactly.
+def _parts(value):
+    try:
+        return value.numerator, value.denominator
+    except AttributeError:
+        if isinstance(value, float) and math.isfinite(value):
+            return value.as_integer_ratio()
+        return None
+
+# -1, 0 or 1 as the Fraction f is less than, equal to or greater than
+# other, or NotImplemented.  Infinities are beyond every Fraction.
+# Against a nan the result is a nan, which makes every comparison
+# False, the same as comparing with the nan itself.
+def _order(f, other):
+    parts = _parts(other)
+    if parts is None:
+        if isinstance(other, float):
+            if math.isnan(other):
+                return other
+            return -1 if other > 0 else 1
+        return NotImplemented
+    return _compare(f.numerator, f.denominator, *parts)
+
+# Compare a/b with c/d (b and d positive).  Returns -1, 0 or 1.
+#
+# Exactly, a/b < c/d is a*d < c*b.  For small numbers that's the cheapest
+# thing there is.  For big numbers the products get expensive, so first
+# compare the two values as floats.  Dividing two ints gives the
+# correctly rounded float, and rounding never swaps the order of two
+# numbers, so if the floats differ they give the right answer.  Only
+# when they're equal (too close to call) are the products needed.
+FLOAT_PREFILTER_BITS = 512
+
+def _compare(a, b, c, d):
+    if b == d:
+        x, y = a, c
+    else:
+        if b.bit_length() + d.bit_length() > FLOAT_PREFILTER_BITS:
+            try:
+                fx = a / b
+                fy = c / d
+            except OverflowError:
+                pass
+            else:
+                if fx != fy:
+                    return -1 if fx < fy else 1
+        x, y = a * d, c * b
+    return (x > y) - (x < y)
+
+# Float sort key for a fraction.  Values too big for a float become
+# +/- infinity (still in the right order relative to everything else).
+def sort_key(f):
+    try:
+        return f.numerator / f.denominator
+    except OverflowError:
+        return math.inf if f.numerator > 0 else -math.inf
+
+# Sort a list of fractions about as fast as sorting floats.  Everything
+# is sorted on its float key.  Floats are correctly rounded, so only
+# values with exactly the same key can possibly be out of order.  Those
+# runs are then sorted exactly.
+def sort_fractions(fracs, reverse=False):
+    result = sorted(fracs, key=sort_key, reverse=reverse)
+    keys = [sort_key(f) for f in result]
+
+    # Positions where the key is the same as the one before
+    ties = list(itertools.compress(range(1, len(keys)), map(operator.eq, keys[1:], keys)))
+    start = end = None
+    for i in ties + [None]:
+        if i is not None and i == end:
+            end += 1
+            continue
+        if start is not None:
+            result[start:end] = sorted(result[start:end], reverse=reverse)
+        if i is not None:
+            start, end = i - 1, i + 1
+    return result
+
+# The slot descriptors' own setters.  These are a lot cheaper than
+# object.__setattr__(self, 'numerator', ...)
+_set_numerator = Fraction.numerator.__set__
+_set_denominator = Fraction.denominator.__set__
+_set_hash = Fraction._hash.__set__
+
+_HASH_MODULUS = sys.hash_info.modulus
+_HASH_INF = sys.hash_info.inf
+
+# Fill the small value cache up front.  It's a fixed size, and then
+# Fraction() never has to add to it.
+for _d in range(1, SMALL_LIMIT + 1):
+    for _n in range(-SMALL_LIMIT, SMALL_LIMIT + 1):
+        if gcd(_n, _d) == 1:
+            _small_fractions[_n, _d] = Fraction(_n, _d)
+del _n, _d
 
+# -----------------------------------------------------------------------------
+# Accumulator - a running sum that isn't reduced after every term
+#
+#    >>> acc = Accumulator()
+#    >>> for f in fracs:
+#    ...     acc.add(f)
+#    >>> acc.result()
+#
+# Terms are first grouped by denominator.  Terms that share a denominator
+# are merged by adding numerators (no multiplication, no gcd).  When there
+# are more than MAX_GROUPS different denominators, the groups get folded
+# into a running total over their least common multiple.  The total is
+# only put into lowest terms if it grows past MAX_BITS, and once more at
+# the very end.  The answer is exactly what adding one term at a time
+# gives.
+# -----------------------------------------------------------------------------
+class Accumulator:
+    MAX_GROUPS = 256
+    MAX_BITS = 4096
+
+    def __init__(self, start=0, max_groups=None, max_bits=None):
+        self.max_groups = max_groups or self.MAX_GROUPS
+        self.max_bits = max_bits or self.MAX_BITS
+        self.numerator = start.numerator
+        self.denominator = start.denominator
+        self.groups = { }
+
+    def add(self, value):
+        denom = value.denominator
+        self.groups[denom] = self.groups.get(denom, 0) + value.numerator
+        if len(self.groups) > self.max_groups:
+            self.fold()
+
+    def extend(self, values):
+        groups = self.groups
+        for value in values:
+            denom = value.denominator
+            groups[denom] = groups.get(denom, 0) + value.numerator
+            if len(groups) > self.max_groups:
+                self.fold()
+
+    # Move the grouped terms into the running total
+    def fold(self):
+        numer, denom = self.numerator, self.denominator
+        for gdenom, gnumer in self.groups.items():
+            if gdenom == denom:
+                numer += gnumer
+                continue
+            g = math.gcd(denom, gdenom)
+            numer = numer * (gdenom // g) + gnumer * (denom // g)
+            denom = denom // g * gdenom
+        self.groups.clear()
+        if denom.bit_length() > self.max_bits or numer.bit_length() > self.max_bits:
+            d = math.gcd(numer, denom)
+            numer //= d
+            denom //= d
+        self.numerator, self.denominator = numer, denom
+
+    def result(self):
+        self.fold()
+        return Fraction(self.numerator, self.denominator)
 
 def make_frac(numer, denom):
     #d = gcd(numer, denom)
@@ -200,6 +648,101 @@ def test_math():
 
 test_math()
 
+# Fractions are compact (no __dict__) and small values are shared
+def test_compact():
+    a = Fraction(1, 2)
+    assert not hasattr(a, '__dict__')
+    assert Fraction(2, 4) is a
+    assert Fraction(-3, -6) is a
+    assert Fraction(0, 5) is Fraction(0, -7)
+    assert Fraction(1000, 3) is not Fraction(1000, 3)
+
+    try:
+        del a.numerator
+        assert False, "numerator can be deleted"
+    except AttributeError:
+        pass
+
+    import pickle
+    assert pickle.loads(pickle.dumps(a)) is a
+    b = pickle.loads(pickle.dumps(Fraction(1000, 3)))
+    assert (b.numerator, b.denominator) == (1000, 3)
+
+    print('Good compact fractions')
+
+test_compact()
+
+# Bulk sums and products give the same answer as one term at a time
+def test_bulk():
+    import random
+    rand = random.Random(7)
+    fracs = [Fraction(rand.randint(-50, 50), rand.randint(1, 60)) for _ in range(2000)]
+
+    total = Fraction(0, 1)
+    for f in fracs:
+        total = total + f
+    s = Fraction.sum(fracs)
+    assert (s.numerator, s.denominator) == (total.numerator, total.denominator)
+
+    # Same thing, folding and reducing all the time
+    acc = Accumulator(max_groups=3, max_bits=16)
+    for f in fracs:
+        acc.add(f)
+    s = acc.result()
+    assert (s.numerator, s.denominator) == (total.numerator, total.denominator)
+
+    nonzero = [f for f in fracs[:200] if f.numerator]
+    product = Fraction(1, 1)
+    for f in nonzero:
+        product = product * f
+    p = Fraction.prod(nonzero, max_bits=64)
+    assert (p.numerator, p.denominator) == (product.numerator, product.denominator)
+
+    s = Fraction.sum([Fraction(1, 2), 1, Fraction(1, 3)])
+    assert (s.numerator, s.denominator) == (11, 6)
+    assert Fraction.sum([]) is Fraction(0, 1)
+
+    print('Good bulk math')
+
+test_bulk()
+
+# Comparisons, including values too close together for floats
+def test_compare():
+    a = Fraction(10**20 + 1, 10**20)
+    b = Fraction(10**20 + 2, 10**20 + 1)
+    assert a.numerator / a.denominator == b.numerator / b.denominator
+    assert b < a and b <= a and a > b and a >= b and a != b
+
+    big = Fraction(3**400 + 1, 5**300)
+    bigger = Fraction(3**400 + 2, 5**300 + 1)
+    assert (big < bigger) == ((3**400 + 1) * (5**300 + 1) < (3**400 + 2) * 5**300)
+    assert Fraction(10**400, 3) > Fraction(10**399, 1)
+
+    # Mixed with ints and floats
+    assert Fraction(1, 2) < 1 and 0 < Fraction(1, 2)
+    assert Fraction(1, 2) == 0.5 and Fraction(1, 3) != 1/3
+    assert Fraction(3, 1) == 3
+    assert Fraction(1, 2) != 'a'
+    inf, nan = float('inf'), float('nan')
+    assert Fraction(10**400, 1) < inf and Fraction(-10**400, 1) > -inf
+    assert inf > Fraction(1, 2) and not Fraction(1, 2) >= inf and Fraction(1, 2) != inf
+    assert not (Fraction(1, 2) < nan or Fraction(1, 2) <= nan or Fraction(1, 2) > nan
+                or Fraction(1, 2) >= nan or Fraction(1, 2) == nan or nan < Fraction(1, 2))
+    assert Fraction(1, 2) != nan
+
+    import random
+    rand = random.Random(3)
+    fracs = [Fraction(rand.randint(-100, 100), rand.randint(1, 100)) for _ in range(2000)]
+    fracs += [a, b, Fraction(10**400, 7), Fraction(-10**400, 7)]
+    expected = sorted(fracs, key=lambda f: (f.numerator * 10**500) // f.denominator)
+    assert sort_fractions(fracs) == expected
+    assert sort_fractions(fracs, reverse=True) == expected[::-1]
+    assert sorted(fracs) == expected
+
+    print('Good comparisons')
+
+test_compare()
+
 # -----------------------------------------------------------------------------
 # Niceties
 #
@@ -227,8 +770,47 @@ def test_nice():
 
     print('Nice fractions')
 
-# Uncomment when ready
-# test_nice()
+test_nice()
+
+# Decimal digits without going through float
+def test_digits():
+    import itertools
+    assert list(Fraction(3, 8).digits()) == [3, 7, 5]
+    assert list(itertools.islice(Fraction(1, 7).digits(), 14)) == [1, 4, 2, 8, 5, 7] * 2 + [1, 4]
+    assert list(Fraction(-5, 4).digits()) == [2, 5]
+    assert list(Fraction(1, 2).digits(base=2)) == [1]
+    assert list(Fraction(4, 1).digits()) == []
+
+    assert Fraction(7, 6).expansion() == (1, [1], [6])
+    assert Fraction(1, 8).expansion() == (0, [1, 2, 5], [])
+    assert Fraction(1, 7).expansion(limit=3) == (0, [1, 4, 2], None)
+
+    # A repeat longer than the limit still gives the right digits
+    f = Fraction(1, 97)
+    assert (list(itertools.islice(f.digits(limit=5), 200)) ==
+            list(itertools.islice(f.digits(), 200)))
+
+    assert format(Fraction(2, 3), '.3f') == '0.667'
+    assert format(Fraction(-2, 3), '.0f') == '-1'
+    assert format(Fraction(1, 8), '.2f') == '0.12'         # half to even
+    assert format(Fraction(3, 8), '.2f') == '0.38'
+    assert format(Fraction(-1, 1000), '.1f') == format(-1 / 1000, '.1f') == '-0.0'
+    assert format(Fraction(0, 1), '.1f') == '0.0'
+    assert format(Fraction(-1, 3), '010') == '-0000001/3'
+    assert format(Fraction(-1, 3), '8') == '    -1/3'
+    assert format(Fraction(1, 3), '+') == '+1/3'
+    assert format(Fraction(1, 3), '+08.3f') == '+000.333'
+    assert format(Fraction(1, 3), '10.2f') == '      0.33'
+    assert format(Fraction(1, 4), '.1%') == '25.0%'
+    assert format(Fraction(1, 3)) == '1/3'
+    big = Fraction(10**50 + 1, 3)
+    assert format(big, '.2f') == '33333333333333333333333333333333333333333333333333.67'
+    for n, d in [(1, 3), (-7, 9), (123457, 1000), (5, 16)]:
+        assert format(Fraction(n, d), '.4f') == format(n / d, '.4f')
+
+    print('Good digits')
+
+test_digits()
 
 
 # -----------------------------------------------------------------------------
@@ -277,5 +859,74 @@ def test_immutability():
 
     print('Good immutability')
 
-# Uncomment
-# test_immutability()
+test_immutability()
+
+# Hashes agree with ints and floats, so mixed keys find each other
+def test_hash():
+    assert hash(Fraction(3, 1)) == hash(3)
+    assert hash(Fraction(-7, 1)) == hash(-7)
+    assert hash(Fraction(1, 2)) == hash(0.5)
+    assert hash(Fraction(-3, 8)) == hash(-0.375)
+    assert hash(Fraction(-1, 1)) == hash(-1) == -2
+
+    import fractions
+    for n, d in [(1, 3), (-22, 7), (10**30, 3**40), (2**61 - 1, 5), (5, 2**61 - 1)]:
+        assert hash(Fraction(n, d)) == hash(fractions.Fraction(n, d))
+
+    d = { 1: 'one', 0.25: 'quarter' }
+    assert d[Fraction(1, 1)] == 'one'
+    assert d[Fraction(1, 4)] == 'quarter'
+    d[Fraction(2, 3)] = 'two thirds'
+    assert Fraction(4, 6) in d
+
+    # Worked out once, then remembered
+    a = Fraction(1000, 3)
+    h = hash(a)
+    assert a._hash == h and hash(a) == h
+
+    print('Good hashing')
+
+test_hash()
+
+# Operators with ints, reflected operators and zero
+def test_mixed():
+    a = Fraction(2, 3)
+    for result, expected in [(1 - a, (1, 3)), (a - 1, (-1, 3)), (1 / a, (3, 2)),
+                             (a / 4, (1, 6)), (a / -4, (-1, 6)), (-2 / a, (-3, 1)),
+                             (6 * a, (4, 1)), (a * -3, (-2, 1)), (-a, (-2, 3)),
+                             (abs(Fraction(-5, 7)), (5, 7)), (a + Fraction(1, 6), (5, 6)),
+                             (Fraction(1, 6) - Fraction(1, 6), (0, 1)),
+                             (Fraction(5, 12) + Fraction(7, 18), (29, 36)),
+                             (Fraction(1, 4) + Fraction(1, 12), (1, 3)),
+                             (Fraction(3, 4) / Fraction(-9, 8), (-2, 3)),
+                             (Fraction(9, 1) + Fraction(-4, 1), (5, 1))]:
+        assert (result.numerator, result.denominator) == expected
+
+    # Against the standard library on random values
+    import fractions, random, operator
+    rand = random.Random(11)
+    for _ in range(2000):
+        x = (rand.randint(-10**6, 10**6), rand.randint(1, 1000))
+        y = (rand.choice([1, -1]) * rand.randint(1, 10**6), rand.randint(1, 1000))
+        k = rand.choice([-12, -1, 0, 1, 7, 360])
+        for op in (operator.add, operator.sub, operator.mul, operator.truediv):
+            for left, right, sleft, sright in [
+                    (Fraction(*x), Fraction(*y), fractions.Fraction(*x), fractions.Fraction(*y)),
+                    (Fraction(*x), k, fractions.Fraction(*x), k),
+                    (k, Fraction(*y), k, fractions.Fraction(*y))]:
+                if op is operator.truediv and sright == 0:
+                    continue
+                mine, theirs = op(left, right), op(sleft, sright)
+                assert (mine.numerator, mine.denominator) == (theirs.numerator, theirs.denominator)
+
+    for bad in (lambda: a / 0, lambda: 1 / Fraction(0, 3), lambda: a / Fraction(0, 1),
+                lambda: Fraction(1, 0)):
+        try:
+            bad()
+            assert False, "expected ZeroDivisionError"
+        except ZeroDivisionError:
+            pass
+
+    print('Good mixed math')
+
+test_mixed()
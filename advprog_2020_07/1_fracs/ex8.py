@@ -15,11 +15,29 @@
 # value of n.
 #
 # See if your fraction implementation can run Fractran
+#
+# Profiling
+# ---------
+# Pass a Profile to run() to see where the time goes:
+#
+#    >>> profile = Profile(sample=100)
+#    >>> run(fibcode, 78 * 5**5, profile)
+#    >>> profile.fires          # times each rule fired
+#    >>> profile.scans          # {rules checked before one fired: steps}
+#    >>> profile.export('trace.json')
+#
+# Without a profile, run() is the plain evaluator below.  suggest_order()
+# uses a profile to find an order of the rules that needs fewer checks.
+
+import json
+import time
 
 from ex7 import Fraction
 
 # The evaluator
-def run(prog, n):
+def run(prog, n, profile=None):
+    if profile is not None:
+        return _run_profiled(prog, n, profile)
     while True:
         for f in prog:
             nf = f * n
@@ -29,6 +47,91 @@ def run(prog, n):
         else:
             return n
 
+# Statistics gathered by run().  A Profile can be passed to several runs
+# of the same program and adds them up.
+class Profile:
+    def __init__(self, sample=0):
+        self.sample = sample       # keep every sample-th step in the trace (0 = no trace)
+        self.runs = 0
+        self.steps = 0
+        self.seconds = 0.0
+        self.fires = []            # per rule
+        self.scans = { }           # {rules checked until one fired: number of steps}
+        self.trace = []            # (run, step, rule, n) for the sampled steps
+        self.together = set()      # (i, j) pairs of rules that could both fire at some step
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'runs': self.runs,
+                'steps': self.steps,
+                'seconds': self.seconds,
+                'fires': self.fires,
+                'scans': sorted(self.scans.items()),
+                'trace': self.trace,
+            }, f)
+
+    # Total rule checks, if the rules were in this order (a list of rule
+    # indices, the current order by default).  Steps only, not the final
+    # check where nothing fires.
+    def cost(self, order=None):
+        if order is None:
+            order = range(len(self.fires))
+        return sum((pos + 1) * self.fires[r] for pos, r in enumerate(order))
+
+def _run_profiled(prog, n, profile):
+    if not profile.fires:
+        profile.fires = [0] * len(prog)
+    elif len(profile.fires) != len(prog):
+        raise ValueError('profile is from a program with a different number of rules')
+    fires = profile.fires
+    scans = profile.scans
+    together = profile.together
+    sample = profile.sample
+    step = 0
+    start = time.perf_counter()
+    while True:
+        # Check every rule, not just up to the first that fires, so we
+        # know which rules could be moved past each other
+        enabled = [i for i, f in enumerate(prog) if (f * n).denominator == 1]
+        if not enabled:
+            break
+        r = enabled[0]
+        n = prog[r] * n
+        fires[r] += 1
+        scans[r + 1] = scans.get(r + 1, 0) + 1
+        for pos, i in enumerate(enabled):
+            for j in enabled[pos + 1:]:
+                together.add((i, j))
+        step += 1
+        if sample and step % sample == 0:
+            profile.trace.append((profile.runs, step, r, int(n)))
+    profile.seconds += time.perf_counter() - start
+    profile.steps += step
+    profile.runs += 1
+    return n
+
+# Suggest a cheaper order for the rules of prog.  Two neighbouring rules
+# can swap places if they were never able to fire at the same step:
+# whichever one fires, it's still the first match.  Rules that fire more
+# often are moved up past such neighbours.  Returns the new order as a
+# list of rule indices, with the rule checks before and after.
+#
+# This is only as good as the runs in the profile.  A state that never
+# came up while profiling might still tell the rules apart.
+def suggest_order(profile):
+    order = list(range(len(profile.fires)))
+    fires = profile.fires
+    moved = True
+    while moved:
+        moved = False
+        for pos in range(len(order) - 1):
+            a, b = order[pos], order[pos + 1]
+            if fires[b] > fires[a] and (min(a, b), max(a, b)) not in profile.together:
+                order[pos], order[pos + 1] = b, a
+                moved = True
+    return order, profile.cost(), profile.cost(order)
+
 # Here is a sample Fractran program that computes Fibonacci numbers
 fibcode = [ 
     Fraction(17, 65),
@@ -52,8 +155,45 @@ fibcode = [
 def fibonacci(n):
     import math
     result = run(fibcode, 78 * 5**(n - 1))
-    return math.log2(int(result))
+    return math.log2(result.numerator)
+
+def test_profile():
+    profile = Profile(sample=10)
+    start = 78 * 5**5
+    assert run(fibcode, start, profile) == run(fibcode, start)
+    assert profile.runs == 1
+    assert profile.steps == sum(profile.fires) == sum(profile.scans.values())
+    assert len(profile.trace) == profile.steps // 10
+    assert profile.cost() == sum(k * v for k, v in profile.scans.items())
+
+    order, before, after = suggest_order(profile)
+    assert sorted(order) == list(range(len(fibcode)))
+    assert after == profile.cost(order) < before
+    reordered = [fibcode[i] for i in order]
+    for n in range(1, 9):
+        assert run(reordered, 78 * 5**(n - 1)) == run(fibcode, 78 * 5**(n - 1))
+
+    # Rules that can fire together keep their order
+    prog = [Fraction(3, 2), Fraction(5, 2)]
+    profile = Profile()
+    run(prog, 2**5, profile)
+    assert suggest_order(profile)[0] == [0, 1]
+
+    import os, tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trace.json')
+        profile = Profile(sample=1)
+        run(fibcode, start, profile)
+        profile.export(path)
+        with open(path) as f:
+            data = json.load(f)
+        assert data['steps'] == profile.steps == len(data['trace'])
+
+    print('Good fractran profiling')
+
+test_profile()
 
 # Try it out
-for n in range(1, 16):
-    print(fibonacci(n))
+if __name__ == '__main__':
+    for n in range(1, 16):
+        print(fibonacci(n))
@@ -0,0 +1,291 @@
+# fracarray.py
+# -----------------------------------------------------------------------------
+# FractionArray - lots of fractions at once
+#
+# The Fraction class from ex7.py is fine for a handful of numbers, but
+# pushing millions of fractions through it one object at a time means
+# every + or * allocates a new instance and runs the pure-Python gcd()
+# loop.
+#
+# A FractionArray keeps the same data (numerator, denominator) but
+# changes the representation: all of the numerators live in one NumPy
+# array and all of the denominators live in another.  Arithmetic,
+# comparison and reduction to lowest terms are then done in one
+# vectorized pass over the whole array.
+#
+# The arrays are normally int64.  Before every operation we check if
+# the result could overflow 64 bits.  If it could, the arrays switch to
+# object arrays of Python ints (slower, but exact).  When the numbers
+# shrink back down again, they switch back to int64.
+#
+#    >>> a = FractionArray([4, 3], [6, -4])
+#    >>> a
+#    FractionArray([2/3, -3/4])
+#    >>> (a + 1).to_fractions()
+#    [Fraction(5, 3), Fraction(1, 4)]
+#    >>>
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+from ex7 import Fraction
+
+INT64_MAX = 2**63 - 1
+
+def _absmax(a):
+    # Largest magnitude in an array as a Python int (for overflow checks)
+    if a.size == 0:
+        return 0
+    return int(np.max(np.abs(a)))
+
+def _as_array(values):
+    # Make an int64 array if everything fits. Otherwise an object array
+    values = [int(v) for v in values]
+    if all(-INT64_MAX <= v <= INT64_MAX for v in values):
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=object)
+
+def _widen(bound, *arrays):
+    # If an operation could produce a value of size 'bound', make sure
+    # the arrays are wide enough to hold it.
+    if bound > INT64_MAX or any(a.dtype == object for a in arrays):
+        return tuple(a.astype(object) for a in arrays)
+    return arrays
+
+class FractionArray:
+    def __init__(self, numerators, denominators=None):
+        if denominators is None:
+            denominators = [1] * len(numerators)
+        if len(numerators) != len(denominators):
+            raise ValueError("numerators and denominators have different lengths")
+        numer = numerators if isinstance(numerators, np.ndarray) else _as_array(numerators)
+        denom = denominators if isinstance(denominators, np.ndarray) else _as_array(denominators)
+        if np.any(denom == 0):
+            raise ZeroDivisionError("zero denominator in FractionArray")
+        self.numerators, self.denominators = self._reduce(numer, denom)
+
+    # Build from arrays that are already in lowest terms (skips the gcd pass)
+    @classmethod
+    def _from_reduced(cls, numer, denom):
+        self = cls.__new__(cls)
+        self.numerators = numer
+        self.denominators = denom
+        return self
+
+    @classmethod
+    def from_fractions(cls, fracs):
+        fracs = list(fracs)
+        return cls([f.numerator for f in fracs], [f.denominator for f in fracs])
+
+    def to_fractions(self):
+        return [Fraction(int(n), int(d)) for n, d in zip(self.numerators, self.denominators)]
+
+    # Put everything in lowest terms with the sign in the numerator.
+    # Object arrays that fit back into 64 bits are narrowed again.
+    @staticmethod
+    def _reduce(numer, denom):
+        d = np.gcd(numer, denom)
+        numer = numer // d
+        denom = denom // d
+        neg = denom < 0
+        if np.any(neg):
+            numer = np.where(neg, -numer, numer)
+            denom = np.where(neg, -denom, denom)
+        if numer.dtype == object and max(_absmax(numer), _absmax(denom)) <= INT64_MAX:
+            numer = numer.astype(np.int64)
+            denom = denom.astype(np.int64)
+        return numer, denom
+
+    # Turn the other operand into a pair of arrays.  Scalars (Fraction or
+    # int) become length-1 arrays and broadcast against self.
+    def _operand(self, other):
+        if isinstance(other, FractionArray):
+            if len(other) != len(self):
+                raise ValueError("FractionArray lengths differ")
+            return other.numerators, other.denominators
+        if hasattr(other, 'numerator') and hasattr(other, 'denominator'):
+            return _as_array([other.numerator]), _as_array([other.denominator])
+        return None
+
+    def __len__(self):
+        return len(self.numerators)
+
+    def __iter__(self):
+        return iter(self.to_fractions())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FractionArray._from_reduced(self.numerators[index], self.denominators[index])
+        return Fraction(int(self.numerators[index]), int(self.denominators[index]))
+
+    def __repr__(self):
+        items = ', '.join(f'{n}/{d}' if d != 1 else f'{n}'
+                          for n, d in zip(self.numerators, self.denominators))
+        return f'FractionArray([{items}])'
+
+    # Arithmetic
+    def _addsub(self, other, sign):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        n1, d1 = self.numerators, self.denominators
+        n2, d2 = operand
+        bound = max(_absmax(n1) * _absmax(d2) + _absmax(d1) * _absmax(n2),
+                    _absmax(d1) * _absmax(d2))
+        n1, d1, n2, d2 = _widen(bound, n1, d1, n2, d2)
+        if sign > 0:
+            numer = n1 * d2 + d1 * n2
+        else:
+            numer = n1 * d2 - d1 * n2
+        return FractionArray(numer, d1 * d2)
+
+    def __add__(self, other):
+        return self._addsub(other, 1)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._addsub(other, -1)
+
+    def __rsub__(self, other):
+        result = self._addsub(other, -1)
+        if result is NotImplemented:
+            return result
+        return -result
+
+    def __neg__(self):
+        return FractionArray._from_reduced(-self.numerators, self.denominators)
+
+    @staticmethod
+    def _mul(n1, d1, n2, d2):
+        bound = max(_absmax(n1) * _absmax(n2), _absmax(d1) * _absmax(d2))
+        n1, d1, n2, d2 = _widen(bound, n1, d1, n2, d2)
+        return FractionArray(n1 * n2, d1 * d2)
+
+    def __mul__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return self._mul(self.numerators, self.denominators, *operand)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        n2, d2 = operand
+        if np.any(n2 == 0):
+            raise ZeroDivisionError("division by zero in FractionArray")
+        return self._mul(self.numerators, self.denominators, d2, n2)
+
+    def __rtruediv__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        if np.any(self.numerators == 0):
+            raise ZeroDivisionError("division by zero in FractionArray")
+        return self._mul(operand[0], operand[1], self.denominators, self.numerators)
+
+    # Comparisons.  Like NumPy, these give back an array of booleans.
+    # Both sides are in lowest terms with positive denominators, so
+    # equality is just comparing the parts and ordering is a
+    # cross-multiply.
+    def _cross(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return None
+        n1, d1 = self.numerators, self.denominators
+        n2, d2 = operand
+        bound = max(_absmax(n1) * _absmax(d2), _absmax(n2) * _absmax(d1))
+        n1, d1, n2, d2 = _widen(bound, n1, d1, n2, d2)
+        return n1 * d2, n2 * d1
+
+    def __eq__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return (self.numerators == operand[0]) & (self.denominators == operand[1])
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return ~result
+
+    def __lt__(self, other):
+        cross = self._cross(other)
+        return NotImplemented if cross is None else cross[0] < cross[1]
+
+    def __le__(self, other):
+        cross = self._cross(other)
+        return NotImplemented if cross is None else cross[0] <= cross[1]
+
+    def __gt__(self, other):
+        cross = self._cross(other)
+        return NotImplemented if cross is None else cross[0] > cross[1]
+
+    def __ge__(self, other):
+        cross = self._cross(other)
+        return NotImplemented if cross is None else cross[0] >= cross[1]
+
+    # Comparisons return arrays, so these can't be dict keys
+    __hash__ = None
+
+def test_fracarray():
+    # Same numbers as test_math() in ex7.py, but a whole column at a time
+    a = FractionArray.from_fractions([Fraction(4, 6), Fraction(1, 3)])
+    b = FractionArray.from_fractions([Fraction(-3, -4), Fraction(-1, 2)])
+    assert list(a.numerators) == [2, 1] and list(a.denominators) == [3, 3]
+    assert list(b.numerators) == [3, -1] and list(b.denominators) == [4, 2]
+
+    def check(arr, expected):
+        assert [(f.numerator, f.denominator) for f in arr.to_fractions()] == expected
+
+    check(a + b, [(17, 12), (-1, 6)])
+    check(a - b, [(-1, 12), (5, 6)])
+    check(a * b, [(1, 2), (-1, 6)])
+    check(a / b, [(8, 9), (-2, 3)])
+    check(a + 1, [(5, 3), (4, 3)])
+    check(1 + a, [(5, 3), (4, 3)])
+    check(1 - a, [(1, 3), (2, 3)])
+    check(10 * a, [(20, 3), (10, 3)])
+    check(1 / a, [(3, 2), (3, 1)])
+    check(a + Fraction(1, 3), [(1, 1), (2, 3)])
+
+    assert list(a < b) == [True, False]
+    assert list(a <= b) == [True, False]
+    assert list(a > b) == [False, True]
+    assert list(a >= b) == [False, True]
+    assert list(a != b) == [True, True]
+    assert list(a == Fraction(2, 3)) == [True, False]
+
+    # Round trip through Fraction objects
+    assert a[0] == Fraction(2, 3)
+    assert len(a[1:]) == 1 and a[1:][0] == Fraction(1, 3)
+
+    # Overflow of int64 falls back to Python ints and stays exact
+    big = FractionArray([2**40, 3], [3, 2**40 + 1])
+    c = big * big
+    assert c.numerators.dtype == object
+    assert c[0] == Fraction(2**80, 9) and c[1] == Fraction(9, (2**40 + 1)**2)
+    # ... and comes back to int64 when the values shrink
+    d = c / big
+    assert d.numerators.dtype == np.int64
+    assert d.to_fractions() == big.to_fractions()
+
+    # Only the denominator overflows
+    e = FractionArray([1], [2**40]) + FractionArray([1], [2**40 + 1])
+    assert e[0] == Fraction(1, 2**40) + Fraction(1, 2**40 + 1)
+    assert (FractionArray([1], [2**40]) - FractionArray([1], [2**40 + 1]))[0] == \
+        Fraction(1, 2**40) - Fraction(1, 2**40 + 1)
+
+    try:
+        a / FractionArray([0, 1])
+        assert False, "expected ZeroDivisionError"
+    except ZeroDivisionError:
+        pass
+
+    print('Good fraction arrays')
+
+test_fracarray()
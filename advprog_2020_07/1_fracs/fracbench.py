@@ -0,0 +1,407 @@
+# fracbench.py
+# -----------------------------------------------------------------------------
+# Benchmarks for the fraction code
+#
+# Run this file directly to print the numbers:
+#
+#    bash $ python fracbench.py
+#    bash $ python fracbench.py --sizes 1000 --json today.json --baseline last.json
+#
+# bench_class() compares the slotted Fraction in ex7.py against the
+# plain class from ex6.py, which keeps its attributes in a __dict__
+# (the layout ex7 used to have).
+#
+# bench_representations() is about data abstraction.  Exercises 1-7
+# implement the same API (make_frac, numerator, denominator, add_frac,
+# sub_frac, mul_frac, div_frac) on top of tuples, dicts, closures, named
+# tuples and classes.  The application code doesn't care which one it
+# gets, but the choice still costs something.  For each representation
+# this measures construction rate, arithmetic throughput and memory per
+# object.  Results can be saved as JSON and compared against an earlier
+# run to catch regressions.
+#
+# bench_store() times the on-disk FractionStore (fracstore.py) against
+# pickling a list of Fractions.
+#
+# bench_matrix() times FractionMatrix (fracmatrix.py) against plain
+# elimination with Fractions.
+#
+# bench_hash() times dictionaries keyed by Fractions.
+#
+# bench_mixed() times Fraction operators, mostly mixed with ints,
+# against ReferenceFraction, which does them the way ex7 used to.
+#
+# bench_wire() compares the varint stream format (fracwire.py) with
+# pickle and JSON for size and speed.
+#
+# bench_batch() times fractran.run_batch() on a sweep of Fibonacci runs
+# against running them one after another.
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import ex1
+import ex2
+import ex3
+import ex4
+import ex6
+import ex7
+from fracmatrix import FractionMatrix, naive_determinant, naive_solve
+from fracstore import FractionStore
+import fracwire
+import fractran
+
+# Every module that implements the common fraction API.  ex5.py is left
+# out: it's the unfinished "normalize a NamedTuple" puzzle (its tests
+# fail on import) and has the same representation as ex4.py anyway.
+REPRESENTATIONS = {
+    'tuple (ex1)': ex1,
+    'dict (ex2)': ex2,
+    'closure (ex3)': ex3,
+    'namedtuple (ex4)': ex4,
+    'class (ex6)': ex6,
+    'number (ex7)': ex7,
+}
+
+OPERATIONS = ('add_frac', 'sub_frac', 'mul_frac', 'div_frac')
+
+# A change bigger than this (as a fraction) counts as a regression
+TOLERANCE = 0.20
+
+# Average memory used per object by make(i) for i in range(count).  This
+# counts everything the object drags along (its dict, its ints).
+def bytes_per_object(make, count=100_000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [make(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Don't charge the list itself
+    return (after - before - objs.__sizeof__()) / count
+
+# Objects built per second by make(i).  Best of a few runs, since
+# timings on a busy machine are noisy.
+def build_rate(make, count=200_000, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(count):
+            make(i)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+def bench_class():
+    # Numerators and denominators above 256 so that neither class gets
+    # to use Python's cached small ints
+    classes = [('dict (ex6)', ex6.Fraction), ('slots (ex7)', ex7.Fraction)]
+    print('%-12s %12s %14s %14s' % ('class', 'bytes/obj', 'build/s', 'small build/s'))
+    for name, cls in classes:
+        size = bytes_per_object(lambda i: cls(1000 + i, 1001 + i))
+        rate = build_rate(lambda i: cls(1000 + i, 1001 + i))
+        small = build_rate(lambda i: cls(i % 7, 8))
+        print('%-12s %12.1f %14.0f %14.0f' % (name, size, rate, small))
+
+# Random (numerator, denominator) pairs, the same for every representation.
+# Nonzero numerators so that div_frac() never divides by zero.
+def sample_pairs(count, seed=0):
+    rand = random.Random(seed)
+    return [(rand.choice((-1, 1)) * rand.randint(1, 10**6), rand.randint(1, 10**6))
+            for _ in range(count)]
+
+# Shortest of a few timings of func(), in seconds
+def best_time(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_module(mod, size, repeat=3):
+    pairs = sample_pairs(size)
+    make_frac = mod.make_frac
+    result = {}
+
+    result['build_per_sec'] = size / best_time(lambda: [make_frac(n, d) for n, d in pairs], repeat)
+
+    fracs = [make_frac(n, d) for n, d in pairs]
+    others = fracs[1:] + fracs[:1]
+    for name in OPERATIONS:
+        op = getattr(mod, name)
+        elapsed = best_time(lambda: [op(a, b) for a, b in zip(fracs, others)], repeat)
+        result[name + '_per_sec'] = size / elapsed
+
+    del fracs, others
+    result['bytes_per_object'] = bytes_per_object(lambda i: make_frac(*pairs[i]), size)
+    return result
+
+def bench_representations(sizes=(1000, 1_000_000), modules=REPRESENTATIONS):
+    results = {}
+    for name, mod in modules.items():
+        results[name] = { str(size): bench_module(mod, size) for size in sizes }
+    return {
+        'python': platform.python_version(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+    }
+
+def print_report(report):
+    print('%-18s %9s %12s %12s %12s %12s %12s %10s' % (
+          'representation', 'size', 'build/s', 'add/s', 'sub/s', 'mul/s', 'div/s', 'bytes/obj'))
+    for name, by_size in report['results'].items():
+        for size, r in by_size.items():
+            print('%-18s %9s %12.0f %12.0f %12.0f %12.0f %12.0f %10.1f' % (
+                  name, size, r['build_per_sec'], r['add_frac_per_sec'], r['sub_frac_per_sec'],
+                  r['mul_frac_per_sec'], r['div_frac_per_sec'], r['bytes_per_object']))
+
+# Compare two reports.  Returns a list of (representation, size, metric,
+# old, new) for everything that got worse by more than the tolerance.
+# Rates should go up and memory should go down.
+def find_regressions(old, new, tolerance=TOLERANCE):
+    regressions = []
+    for name, by_size in new['results'].items():
+        for size, metrics in by_size.items():
+            before = old['results'].get(name, {}).get(size)
+            if before is None:
+                continue
+            for metric, value in metrics.items():
+                if metric not in before:
+                    continue
+                if metric.endswith('_per_sec'):
+                    worse = value < before[metric] * (1 - tolerance)
+                else:
+                    worse = value > before[metric] * (1 + tolerance)
+                if worse:
+                    regressions.append((name, size, metric, before[metric], value))
+    return regressions
+
+def bench_store(count=200_000):
+    fracs = [ex7.Fraction(n, d) for n, d in sample_pairs(count)]
+    indices = list(range(count))
+    random.Random(1).shuffle(indices)
+    print('%-8s %12s %14s %14s %14s' % ('format', 'bytes', 'write/s', 'seq read/s', 'random read/s'))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.frac')
+        start = time.perf_counter()
+        with FractionStore.create(path) as store:
+            store.extend(fracs)
+        write = count / (time.perf_counter() - start)
+        with FractionStore(path) as store:
+            seq = count / best_time(lambda: list(store), 1)
+            rand = count / best_time(lambda: [store[i] for i in indices], 1)
+        print('%-8s %12d %14.0f %14.0f %14.0f' % ('store', os.path.getsize(path), write, seq, rand))
+
+        path = os.path.join(tmp, 'bench.pickle')
+        start = time.perf_counter()
+        with open(path, 'wb') as f:
+            pickle.dump(fracs, f)
+        write = count / (time.perf_counter() - start)
+        def load():
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        seq = count / best_time(load, 1)
+        # Random access to a pickle means loading all of it first
+        print('%-8s %12d %14.0f %14.0f %14s' % ('pickle', os.path.getsize(path), write, seq, '-'))
+
+# Lookups in a dict with 'count' Fraction keys.  The same key objects
+# only ever work out their hash once.  Freshly built (but equal) keys
+# pay for it on every lookup.  Tuple keys are there for scale.
+def bench_hash(count=1_000_000):
+    pairs = sample_pairs(count)
+    keys = [ex7.Fraction(n, d) for n, d in pairs]
+    start = time.perf_counter()
+    table = { k: i for i, k in enumerate(keys) }
+    build = count / (time.perf_counter() - start)
+    same = count / best_time(lambda: [table[k] for k in keys], 3)
+    fresh_keys = [ex7.Fraction(n, d) for n, d in pairs]
+    fresh = count / best_time(lambda: [table[k] for k in fresh_keys], 1)
+    tuples = { (k.numerator, k.denominator): i for i, k in enumerate(keys) }
+    tuple_keys = list(tuples)
+    tuple_rate = count / best_time(lambda: [tuples[k] for k in tuple_keys], 3)
+    print('%-10s %14s %14s %14s %14s' % ('keys', 'insert/s', 'lookup/s', 'new key/s', 'tuple/s'))
+    print('%-10d %14.0f %14.0f %14.0f %14.0f' % (count, build, same, fresh, tuple_rate))
+
+# ex7.Fraction the way it did arithmetic before it had fast paths, for
+# bench_mixed() to compare against: every operator is the full
+# cross-multiplied formula, whatever the operands, and every result is
+# reduced with the pure Python gcd().
+class ReferenceFraction(ex7.Fraction):
+    __slots__ = ()
+
+    def __new__(cls, numerator, denominator):
+        d = ex7.gcd(numerator, denominator)
+        if (d < 0) != (denominator < 0):
+            d = -d
+        self = object.__new__(cls)
+        ex7._set_numerator(self, numerator // d)
+        ex7._set_denominator(self, denominator // d)
+        return self
+
+    def __add__(self, other):
+        return ReferenceFraction(self.numerator * other.denominator + self.denominator * other.numerator,
+                                 self.denominator * other.denominator)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return ReferenceFraction(self.numerator * other.denominator - self.denominator * other.numerator,
+                                 self.denominator * other.denominator)
+
+    def __rsub__(self, other):
+        return ReferenceFraction(other.numerator * self.denominator - other.denominator * self.numerator,
+                                 other.denominator * self.denominator)
+
+    def __mul__(self, other):
+        return ReferenceFraction(self.numerator * other.numerator, self.denominator * other.denominator)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return ReferenceFraction(self.numerator * other.denominator, self.denominator * other.numerator)
+
+    def __rtruediv__(self, other):
+        return ReferenceFraction(other.numerator * self.denominator, other.denominator * self.numerator)
+
+# (name, operation, integer valued operands?)
+MIXED_OPERATIONS = [
+    ('a + 1', lambda a, b: a + 1, False),
+    ('1 + a', lambda a, b: 1 + a, False),
+    ('a - 1', lambda a, b: a - 1, False),
+    ('1 - a', lambda a, b: 1 - a, False),
+    ('10 * a', lambda a, b: 10 * a, False),
+    ('a / 10', lambda a, b: a / 10, False),
+    ('1 / a', lambda a, b: 1 / a, False),
+    ('a + b', lambda a, b: a + b, False),
+    ('a * b', lambda a, b: a * b, False),
+    ('a / b', lambda a, b: a / b, False),
+    ('n/1 + m/1', lambda a, b: a + b, True),
+    ('n/1 * m/1', lambda a, b: a * b, True),
+]
+
+def bench_mixed(count=200_000):
+    pairs = sample_pairs(count)
+    print('%-12s %14s %14s %10s' % ('operation', 'ops/s', 'reference/s', 'speedup'))
+    for name, op, integer in MIXED_OPERATIONS:
+        rates = []
+        for cls in (ex7.Fraction, ReferenceFraction):
+            values = [cls(n, 1) if integer else cls(n, d) for n, d in pairs]
+            operands = list(zip(values, values[1:] + values[:1]))
+            rates.append(count / best_time(lambda: [op(a, b) for a, b in operands], 3))
+            results = [op(a, b) for a, b in operands[:100]]
+            if cls is ex7.Fraction:
+                expected = results
+            else:
+                assert results == expected
+        print('%-12s %14.0f %14.0f %10.2f' % (name, rates[0], rates[1], rates[0] / rates[1]))
+
+def bench_wire(count=200_000):
+    fracs = [ex7.Fraction(n, d) for n, d in sample_pairs(count)]
+    ordered = ex7.sort_fractions(fracs)
+    # Delta mode is for data like this, where numerators and denominators
+    # change slowly.  Sorting by value doesn't make them do that.
+    series = [ex7.Fraction(n, 1009) for n in range(10**6, 10**6 + count)]
+    formats = [
+        ('varint', lambda fs: fracwire.encode(fs), fracwire.decode),
+        ('varint delta', lambda fs: fracwire.encode(fs, delta=True), fracwire.decode),
+        ('pickle', pickle.dumps, pickle.loads),
+        ('json', lambda fs: json.dumps([[f.numerator, f.denominator] for f in fs]),
+                 lambda data: [ex7.Fraction(n, d) for n, d in json.loads(data)]),
+    ]
+    print('%-14s %-8s %10s %14s %14s' % ('format', 'data', 'bytes/val', 'encode/s', 'decode/s'))
+    for name, dump, load in formats:
+        for label, values in [('random', fracs), ('sorted', ordered), ('series', series)]:
+            data = dump(values)
+            encode = count / best_time(lambda: dump(values), 1)
+            decode = count / best_time(lambda: load(data), 1)
+            print('%-14s %-8s %10.2f %14.0f %14.0f' % (name, label, len(data) / count, encode, decode))
+
+def bench_batch(count=22, workers=None):
+    starts = [78 * 5**(n - 1) for n in range(1, count + 1)]
+    workers = workers or os.cpu_count() or 1
+    print('%-6s %8s %12s %12s %10s' % ('mode', 'workers', 'sequential', 'batch', 'speedup'))
+    for fast in (False, True):
+        expected = None
+        def sequential():
+            nonlocal expected
+            expected = [fractran.fibprog.exponents(n, fast) for n in starts]
+        def batch():
+            assert fractran.run_batch(fractran.fibprog, starts, workers, fast,
+                                      exponents=True) == expected
+        seq = best_time(sequential, 1)
+        par = best_time(batch, 1)
+        print('%-6s %8d %12.3f %12.3f %10.2f' % ('fast' if fast else 'step', workers,
+                                                  seq, par, seq / par))
+
+# Plain Fraction elimination is far too slow past this size (it already
+# takes over a minute at n=50), so bigger sizes only time FractionMatrix
+NAIVE_MATRIX_LIMIT = 50
+
+def bench_matrix(sizes=(50, 200)):
+    rand = random.Random(2)
+    print('%-6s %12s %12s %12s %12s %12s' % ('n', 'det', 'solve', 'inverse', 'naive det', 'naive solve'))
+    for n in sizes:
+        rows = [[ex7.Fraction(rand.randint(-9, 9), rand.randint(1, 9)) for _ in range(n)]
+                for _ in range(n)]
+        b = [ex7.Fraction(rand.randint(-9, 9), rand.randint(1, 9)) for _ in range(n)]
+        m = FractionMatrix(rows)
+        det = best_time(m.determinant, 1)
+        solve = best_time(lambda: m.solve(b), 1)
+        inverse = best_time(m.inverse, 1)
+        if n <= NAIVE_MATRIX_LIMIT:
+            naive = '%12.3f %12.3f' % (best_time(lambda: naive_determinant(rows), 1),
+                                       best_time(lambda: naive_solve(rows, b), 1))
+        else:
+            naive = '%12s %12s' % ('-', '-')
+        print('%-6d %12.3f %12.3f %12.3f %s' % (n, det, solve, inverse, naive))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fraction benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 1_000_000])
+    parser.add_argument('--json', help='save the results to this file')
+    parser.add_argument('--baseline', help='earlier JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    bench_class()
+    print()
+    bench_store()
+    print()
+    bench_matrix()
+    print()
+    bench_hash()
+    print()
+    bench_mixed()
+    print()
+    bench_wire()
+    print()
+    bench_batch()
+    print()
+    report = bench_representations(args.sizes)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(baseline, report)
+        for name, size, metric, before, after in regressions:
+            print(f'REGRESSION {name} size={size} {metric}: {before:.1f} -> {after:.1f}')
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# fracmatrix.py
+# -----------------------------------------------------------------------------
+# Exact linear algebra with fractions
+#
+# Gaussian elimination works fine with Fractions, but it's slow: every
+# row operation builds new Fractions, runs gcd() on them, and the
+# denominators in the middle of the computation keep growing.
+#
+# FractionMatrix avoids fractions during elimination altogether:
+#
+#   1. Every row is multiplied by the lcm of its denominators, which
+#      turns the matrix into integers (this doesn't change the solution
+#      of a system, and the determinant just gets divided back out).
+#
+#   2. The integer matrix is eliminated with Bareiss' algorithm.  Each
+#      update is   a[i][j] = (a[i][j]*a[k][k] - a[i][k]*a[k][j]) // prev
+#      where prev is the previous pivot.  The division is always exact, so
+#      everything stays an integer and no bigger than a determinant of
+#      the original matrix.
+#
+#   3. Only the final answers become Fractions (and get reduced).
+#
+#    >>> m = FractionMatrix([[2, 1], [Fraction(1, 2), 3]])
+#    >>> m.determinant()
+#    Fraction(11, 2)
+#    >>> m.solve([3, 1])
+#    [Fraction(16, 11), Fraction(1, 11)]
+#    >>>
+# -----------------------------------------------------------------------------
+
+import math
+
+from ex7 import Fraction
+
+def _frac(value):
+    return Fraction(value.numerator, value.denominator)
+
+class FractionMatrix:
+    def __init__(self, rows):
+        self.rows = [[_frac(x) for x in row] for row in rows]
+        self.nrows = len(self.rows)
+        self.ncols = len(self.rows[0]) if self.rows else 0
+        if any(len(row) != self.ncols for row in self.rows):
+            raise ValueError('rows have different lengths')
+
+    @classmethod
+    def identity(cls, n):
+        return cls([[int(i == j) for j in range(n)] for i in range(n)])
+
+    def __getitem__(self, index):
+        i, j = index
+        return self.rows[i][j]
+
+    def __eq__(self, other):
+        if not isinstance(other, FractionMatrix):
+            return NotImplemented
+        return self.rows == other.rows
+
+    def __repr__(self):
+        return f'FractionMatrix({self.rows!r})'
+
+    def __mul__(self, other):
+        if not isinstance(other, FractionMatrix):
+            return NotImplemented
+        if self.ncols != other.nrows:
+            raise ValueError('matrix shapes do not match')
+        cols = list(zip(*other.rows))
+        return FractionMatrix([[Fraction.sum(a * b for a, b in zip(row, col)) for col in cols]
+                               for row in self.rows])
+
+    def _check_square(self):
+        if self.nrows != self.ncols:
+            raise ValueError('matrix is not square')
+
+    # Step 1: rows scaled to integers.  Returns the integer rows and the
+    # product of the scale factors.
+    def _integer_rows(self, extra=None):
+        rows = []
+        scale = 1
+        for i, row in enumerate(self.rows):
+            row = row + (extra[i] if extra else [])
+            m = math.lcm(*(x.denominator for x in row))
+            rows.append([x.numerator * (m // x.denominator) for x in row])
+            scale *= m
+        return rows, scale
+
+    def determinant(self):
+        self._check_square()
+        rows, scale = self._integer_rows()
+        return Fraction(_bareiss(rows, self.ncols), scale)
+
+    # Solve A x = b for one right hand side (a list), or A X = B for a
+    # FractionMatrix B.
+    def solve(self, b):
+        self._check_square()
+        if isinstance(b, FractionMatrix):
+            extra = b.rows
+        else:
+            extra = [[_frac(x)] for x in b]
+        if len(extra) != self.nrows:
+            raise ValueError('right hand side has the wrong length')
+        rows, _ = self._integer_rows(extra)
+        n = self.ncols
+        det = _bareiss(rows, n)
+        if det == 0:
+            raise ValueError('matrix is singular')
+
+        # Back substitution in integers.  By Cramer's rule det * x is an
+        # integer vector, so every division here is exact.
+        width = len(rows[0]) - n
+        x = [[0] * width for _ in range(n)]
+        for i in reversed(range(n)):
+            row = rows[i]
+            for c in range(width):
+                total = det * row[n + c]
+                for j in range(i + 1, n):
+                    total -= row[j] * x[j][c]
+                x[i][c] = total // row[i]
+
+        result = [[Fraction(v, det) for v in xrow] for xrow in x]
+        if isinstance(b, FractionMatrix):
+            return FractionMatrix(result)
+        return [xrow[0] for xrow in result]
+
+    def inverse(self):
+        return self.solve(FractionMatrix.identity(self.nrows))
+
+# Bareiss elimination of the first n columns of rows (modified in place,
+# extra columns come along for the ride).  Returns the determinant of the
+# n x n part.
+def _bareiss(rows, n):
+    sign = 1
+    prev = 1
+    for k in range(n):
+        if rows[k][k] == 0:
+            for i in range(k + 1, n):
+                if rows[i][k] != 0:
+                    rows[k], rows[i] = rows[i], rows[k]
+                    sign = -sign
+                    break
+            else:
+                return 0
+        pivot_row = rows[k]
+        pivot = pivot_row[k]
+        tail = pivot_row[k + 1:]
+        for i in range(k + 1, n):
+            row = rows[i]
+            factor = row[k]
+            row[k + 1:] = [(a * pivot - factor * c) // prev for a, c in zip(row[k + 1:], tail)]
+            row[k] = 0
+        prev = pivot
+    return sign * prev if n else 1
+
+# The straightforward way, for comparison: Gauss-Jordan elimination with
+# Fractions everywhere.
+def naive_solve(rows, b):
+    n = len(rows)
+    m = [[_frac(x) for x in row] + [_frac(v)] for row, v in zip(rows, b)]
+    for k in range(n):
+        p = next((i for i in range(k, n) if m[i][k].numerator != 0), None)
+        if p is None:
+            raise ValueError('matrix is singular')
+        m[k], m[p] = m[p], m[k]
+        for i in range(n):
+            if i != k and m[i][k].numerator != 0:
+                factor = m[i][k] / m[k][k]
+                m[i] = [a - factor * c for a, c in zip(m[i], m[k])]
+    return [m[i][n] / m[i][i] for i in range(n)]
+
+def naive_determinant(rows):
+    n = len(rows)
+    m = [[_frac(x) for x in row] for row in rows]
+    det = Fraction(1, 1)
+    for k in range(n):
+        p = next((i for i in range(k, n) if m[i][k].numerator != 0), None)
+        if p is None:
+            return Fraction(0, 1)
+        if p != k:
+            m[k], m[p] = m[p], m[k]
+            det = det * -1
+        det = det * m[k][k]
+        for i in range(k + 1, n):
+            factor = m[i][k] / m[k][k]
+            m[i] = [a - factor * c for a, c in zip(m[i], m[k])]
+    return det
+
+def test_matrix():
+    m = FractionMatrix([[2, 1], [Fraction(1, 2), 3]])
+    assert m.determinant() == Fraction(11, 2)
+    assert m.solve([3, 1]) == [Fraction(16, 11), Fraction(1, 11)]
+    assert m * m.inverse() == FractionMatrix.identity(2)
+
+    # Needs a row swap
+    m = FractionMatrix([[0, 1, 2], [1, 0, 3], [4, -3, 8]])
+    assert m.determinant() == -2
+    assert m.inverse() * m == FractionMatrix.identity(3)
+
+    import random
+    rand = random.Random(5)
+    for n in (1, 4, 7):
+        rows = [[Fraction(rand.randint(-9, 9), rand.randint(1, 9)) for _ in range(n)]
+                for _ in range(n)]
+        b = [Fraction(rand.randint(-9, 9), rand.randint(1, 9)) for _ in range(n)]
+        m = FractionMatrix(rows)
+        assert m.determinant() == naive_determinant(rows)
+        assert m.solve(b) == naive_solve(rows, b)
+        assert m * m.inverse() == FractionMatrix.identity(n)
+
+    singular = FractionMatrix([[1, 2], [2, 4]])
+    assert singular.determinant() == 0
+    try:
+        singular.solve([1, 1])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    print('Good fraction matrices')
+
+test_matrix()
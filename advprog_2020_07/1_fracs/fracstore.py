@@ -0,0 +1,225 @@
+# fracstore.py
+# -----------------------------------------------------------------------------
+# An on-disk table of fractions
+#
+# Pickling a big list of Fraction objects is slow, and loading it back
+# means building every single object up front.  A FractionStore keeps
+# the fractions in a simple binary file instead, and reads them through
+# mmap so that only the parts that are actually used get touched.
+#
+# File layout (all little-endian):
+#
+#    header     b'FRAC', version (uint32), count (uint64)
+#    records    count x (numerator int64, denominator int64)
+#
+# Denominators are always positive, so a record with a denominator of 0
+# is used to mean "too big for 64 bits".  Its numerator is then an offset
+# into a side file (path + '.heap') holding the big ints:
+#
+#    heap entry   nbytes of numerator (uint32), nbytes of denominator (uint32),
+#                 numerator bytes (signed), denominator bytes
+#
+#    >>> with FractionStore.create('table.frac') as store:
+#    ...     store.extend([Fraction(1, 3), Fraction(2**70, 7)])
+#    >>> store = FractionStore('table.frac')
+#    >>> store[1]
+#    Fraction(1180591620717411303424, 7)
+#    >>>
+# -----------------------------------------------------------------------------
+
+import mmap
+import os
+import struct
+
+from ex7 import Fraction
+
+MAGIC = b'FRAC'
+VERSION = 1
+HEADER = struct.Struct('<4sIQ')
+RECORD = struct.Struct('<qq')
+HEAP_ENTRY = struct.Struct('<II')
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+
+# Records are read this many at a time when iterating
+CHUNK = 4096
+
+class FractionStore:
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.heap_path = path + '.heap'
+        self.writable = writable
+        self.file = open(path, 'r+b' if writable else 'rb')
+        magic, version, self.count = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a fraction store')
+        if version != VERSION:
+            raise ValueError(f'{path}: unsupported version {version}')
+        self.heap = None
+        self.heap_map = None
+        if os.path.exists(self.heap_path):
+            self.heap = open(self.heap_path, 'r+b' if writable else 'rb')
+        self._map()
+
+    @classmethod
+    def create(cls, path):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0))
+        if os.path.exists(path + '.heap'):
+            os.remove(path + '.heap')
+        return cls(path, writable=True)
+
+    def _map(self):
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.heap is not None and os.fstat(self.heap.fileno()).st_size:
+            self.heap_map = mmap.mmap(self.heap.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap(self):
+        self.map.close()
+        if self.heap_map is not None:
+            self.heap_map.close()
+            self.heap_map = None
+
+    def close(self):
+        self._unmap()
+        self.file.close()
+        if self.heap is not None:
+            self.heap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Writing.  Values are packed into one buffer and written with a
+    # single write() call, then the header count is updated.
+    def extend(self, fracs):
+        if not self.writable:
+            raise IOError('fraction store is read-only')
+        flat = []
+        heap_data = bytearray()
+        heap_start = None
+        for f in fracs:
+            n, d = f.numerator, f.denominator
+            if INT64_MIN <= n <= INT64_MAX and d <= INT64_MAX:
+                flat.append(n)
+                flat.append(d)
+            else:
+                if heap_start is None:
+                    heap_start = self._heap_size()
+                flat.append(heap_start + len(heap_data))
+                flat.append(0)
+                heap_data += _pack_big(n, d)
+        if not flat:
+            return
+
+        if heap_data:
+            if self.heap is None:
+                self.heap = open(self.heap_path, 'w+b')
+            self.heap.seek(0, os.SEEK_END)
+            self.heap.write(heap_data)
+            self.heap.flush()
+
+        added = len(flat) // 2
+        self.file.seek(HEADER.size + self.count * RECORD.size)
+        self.file.write(struct.pack(f'<{len(flat)}q', *flat))
+        self.count += added
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.count))
+        self.file.flush()
+        self._unmap()
+        self._map()
+
+    def append(self, frac):
+        self.extend([frac])
+
+    def _heap_size(self):
+        if self.heap is None:
+            return 0
+        return os.fstat(self.heap.fileno()).st_size
+
+    # Reading
+    def __len__(self):
+        return self.count
+
+    def _make(self, n, d):
+        if d == 0:
+            n, d = _unpack_big(self.heap_map, n)
+        return Fraction(n, d)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('fraction store index out of range')
+        return self._make(*RECORD.unpack_from(self.map, HEADER.size + index * RECORD.size))
+
+    # Each chunk is copied out of the map and unpacked before anything is
+    # yielded, so a half-finished loop doesn't keep the map pinned (that
+    # would stop extend() and close() from remapping it).
+    def __iter__(self):
+        for start in range(0, self.count, CHUNK):
+            stop = min(start + CHUNK, self.count)
+            records = list(RECORD.iter_unpack(
+                self.map[HEADER.size + start * RECORD.size:HEADER.size + stop * RECORD.size]))
+            for n, d in records:
+                yield self._make(n, d)
+
+def _pack_big(n, d):
+    nbytes = (n.bit_length() + 8) // 8
+    dbytes = (d.bit_length() + 8) // 8
+    return (HEAP_ENTRY.pack(nbytes, dbytes) + n.to_bytes(nbytes, 'little', signed=True)
+            + d.to_bytes(dbytes, 'little', signed=True))
+
+def _unpack_big(heap, offset):
+    nbytes, dbytes = HEAP_ENTRY.unpack_from(heap, offset)
+    start = offset + HEAP_ENTRY.size
+    n = int.from_bytes(heap[start:start + nbytes], 'little', signed=True)
+    d = int.from_bytes(heap[start + nbytes:start + nbytes + dbytes], 'little', signed=True)
+    return n, d
+
+def test_store():
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.frac')
+        values = [Fraction(1, 3), Fraction(-4, 6), Fraction(2**70, 7),
+                  Fraction(5, 2**64 + 1), Fraction(INT64_MAX, 1), Fraction(INT64_MIN, 1)]
+        with FractionStore.create(path) as store:
+            store.extend(values[:3])
+            store.extend(values[3:])
+            store.append(Fraction(7, 8))
+            assert len(store) == 7
+
+        with FractionStore(path) as store:
+            assert len(store) == 7
+            assert list(store) == values + [Fraction(7, 8)]
+            assert store[2] == Fraction(2**70, 7)
+            assert store[-1] == Fraction(7, 8)
+            assert store[1:4] == values[1:4]
+            unfinished = iter(store)
+            assert next(unfinished) == values[0]
+            try:
+                store[7]
+                assert False, "expected IndexError"
+            except IndexError:
+                pass
+            try:
+                store.append(Fraction(1, 2))
+                assert False, "store should be read-only"
+            except IOError:
+                pass
+
+        # Reopen for more appends
+        with FractionStore(path, writable=True) as store:
+            unfinished = iter(store)
+            next(unfinished)
+            store.extend([Fraction(-2**100, 3)] * 2)
+            assert store[8] == Fraction(-2**100, 3)
+            assert len(store) == 9
+
+    print('Good fraction store')
+
+test_store()
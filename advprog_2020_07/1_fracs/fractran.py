@@ -0,0 +1,448 @@
+# fractran.py
+# -----------------------------------------------------------------------------
+# A compiled Fractran engine
+#
+# The evaluator in ex8.py is a direct translation of the rules: multiply
+# n by each fraction and check if the denominator is 1.  That works, but
+# n is a big integer that keeps growing, so every step gets slower.
+#
+# There's another way to look at a Fractran program.  Every integer is
+# a product of primes, so n can be written as a list of exponents:
+#
+#     78 * 5**3 = 2**1 * 3**1 * 5**3 * 13**1  ->  [1, 1, 3, 13:1]
+#
+# Multiplying by a fraction p/q just adds the exponents of p and
+# subtracts the exponents of q.  The product n*f is an integer exactly
+# when every exponent of q is available in n.  So each prime behaves
+# like a register in a little machine, and each fraction is an
+# instruction: "if these registers are big enough, subtract from them
+# and add to these others".
+#
+# compile() factors the program once into these register operations.
+# Running it never touches a big integer until the very end.
+#
+# Loop fast-forwarding
+# --------------------
+# Most of the time in a program like fibcode is spent in tiny loops
+# such as "17/65, 133/34, 17/65, 133/34, ..." that move one register
+# into another one unit at a time.  With fast=True, the engine watches
+# the rules that fire.  When the last few rules repeat, it works out how
+# many more times that exact sequence is guaranteed to fire (every
+# condition is a linear inequality in the number of repeats) and applies
+# all of them in one go.  The step count is exactly what the one step
+# at a time evaluator would report.
+#
+#    >>> prog = compile(fibcode)
+#    >>> prog.run(78 * 5**4)
+#    32
+#    >>>
+#
+# Batches
+# -------
+# run_batch() runs one program on many starting values in a pool of
+# worker processes.  Each worker compiles the program once when it
+# starts, and the results come back in the same order as the values.
+# A run can be limited to a number of steps (max_steps) and a number of
+# seconds (timeout):
+#
+#    >>> run_batch(fibcode, [78 * 5**(n - 1) for n in range(1, 6)], exponents=True)
+#    [{2: 1}, {2: 1}, {2: 2}, {2: 3}, {2: 5}]
+#    >>>
+# -----------------------------------------------------------------------------
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ex7 import Fraction
+
+def factorize(n):
+    # Trial division.  Returns {prime: exponent}.  Fractran programs use
+    # small primes, so this is plenty.
+    factors = {}
+    p = 2
+    while p * p <= n:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+        p += 1
+    if n > 1:
+        factors[n] = factors.get(n, 0) + 1
+    return factors
+
+# Raised when a run goes over its max_steps
+class StepLimitExceeded(RuntimeError):
+    pass
+
+class Program:
+    def __init__(self, fracs):
+        fracs = list(fracs)
+        factored = [(factorize(f.numerator), factorize(f.denominator)) for f in fracs]
+        primes = set()
+        for gain, need in factored:
+            primes.update(gain)
+            primes.update(need)
+        self.fracs = fracs
+        self.primes = sorted(primes)
+        index = { p: i for i, p in enumerate(self.primes) }
+
+        # Each rule becomes two small tuples of (register, amount):
+        #   need  - registers that must be at least 'amount' to fire
+        #   delta - how each touched register changes when it fires
+        self.rules = []
+        for gain, need in factored:
+            delta = { index[p]: e for p, e in gain.items() }
+            for p, e in need.items():
+                delta[index[p]] = delta.get(index[p], 0) - e
+            self.rules.append((tuple((index[p], e) for p, e in need.items()),
+                               tuple(delta.items())))
+
+    # Split n into register exponents.  Primes the program never mentions
+    # can't be touched by it, so they're kept aside as 'rest'.
+    def load(self, n):
+        if n < 1:
+            raise ValueError("Fractran needs a positive integer")
+        regs = [0] * len(self.primes)
+        for i, p in enumerate(self.primes):
+            while n % p == 0:
+                regs[i] += 1
+                n //= p
+        return regs, n
+
+    def value(self, regs, rest=1):
+        n = rest
+        for p, e in zip(self.primes, regs):
+            n *= p ** e
+        return n
+
+    # Run the machine on a register list (modified in place).  Returns the
+    # number of steps taken.  If a list is given as 'trace', it collects
+    # (rules, repeats) pairs: the rule indices in 'rules' fired in order,
+    # 'repeats' times over.  expand_trace() turns it back into single steps.
+    #
+    # max_steps stops the run with StepLimitExceeded once more steps than
+    # that have been taken, and deadline (a time.monotonic() value) stops
+    # it with TimeoutError.
+    def execute(self, regs, fast=False, trace=None, max_steps=None, deadline=None):
+        if fast or trace is not None or max_steps is not None or deadline is not None:
+            return self._execute_traced(regs, fast, trace, max_steps, deadline)
+        rules = self.rules
+        steps = 0
+        while True:
+            for need, delta in rules:
+                for i, e in need:
+                    if regs[i] < e:
+                        break
+                else:
+                    for i, d in delta:
+                        regs[i] += d
+                    steps += 1
+                    break
+            else:
+                return steps
+
+    def _execute_traced(self, regs, fast, trace, max_steps=None, deadline=None):
+        rules = self.rules
+        history = []
+        steps = 0
+        if max_steps is None:
+            max_steps = float('inf')
+        check = CLOCK_CHECK
+        while True:
+            for r, (need, delta) in enumerate(rules):
+                for i, e in need:
+                    if regs[i] < e:
+                        break
+                else:
+                    for i, d in delta:
+                        regs[i] += d
+                    steps += 1
+                    if trace is not None:
+                        trace.append(((r,), 1))
+                    break
+            else:
+                if steps > max_steps:
+                    raise StepLimitExceeded(f'Fractran run went over {max_steps} steps')
+                return steps
+
+            if steps > max_steps:
+                raise StepLimitExceeded(f'Fractran run went over {max_steps} steps')
+            if deadline is not None:
+                check -= 1
+                if not check:
+                    check = CLOCK_CHECK
+                    if time.monotonic() > deadline:
+                        raise TimeoutError('Fractran run timed out')
+
+            if not fast:
+                continue
+            history.append(r)
+            for length in range(1, MAX_LOOP + 1):
+                if history[-length:] == history[-2 * length:-length]:
+                    loop = tuple(history[-length:])
+                    repeats = self._loop_repeats(regs, loop)
+                    # A loop that would go past max_steps is stopped
+                    # here: the single steps it stands for would be
+                    if repeats * length > max_steps - steps:
+                        raise StepLimitExceeded(f'Fractran run went over {max_steps} steps')
+                    if repeats:
+                        self._apply_loop(regs, loop, repeats)
+                        steps += repeats * length
+                        if trace is not None:
+                            trace.append((loop, repeats))
+                        history.clear()
+                        break
+            del history[:-2 * MAX_LOOP]
+
+    def _loop_delta(self, loop):
+        total = [0] * len(self.primes)
+        for r in loop:
+            for i, d in self.rules[r][1]:
+                total[i] += d
+        return total
+
+    def _apply_loop(self, regs, loop, repeats):
+        for i, d in enumerate(self._loop_delta(loop)):
+            regs[i] += repeats * d
+
+    # How many more times will 'loop' fire, start to finish, from this
+    # state?  In repeat t (counting from 0) the register i seen by the j-th
+    # rule of the loop is base[i] + t * total[i], where base includes the
+    # rules already fired earlier in the same repeat.  For the j-th rule to
+    # be the one that fires, it has to be enabled and every rule before it
+    # in the program has to be disabled.  Each of those is a bound on t.
+    def _loop_repeats(self, regs, loop):
+        total = self._loop_delta(loop)
+        limit = None
+        base = list(regs)
+        for r in loop:
+            # The rule in the loop must stay enabled
+            for i, e in self.rules[r][0]:
+                if base[i] < e:
+                    return 0
+                if total[i] < 0:
+                    t = (base[i] - e) // -total[i]
+                    limit = t if limit is None else min(limit, t)
+
+            # Earlier rules must stay disabled.  A rule stays disabled
+            # for as long as any one of its needs stays unmet.
+            for need, _ in self.rules[:r]:
+                longest = -1
+                for i, e in need:
+                    if base[i] < e:
+                        if total[i] <= 0:
+                            longest = None
+                            break
+                        longest = max(longest, (e - base[i] - 1) // total[i])
+                if longest is None:
+                    continue
+                if longest < 0:
+                    return 0
+                limit = longest if limit is None else min(limit, longest)
+
+            for i, d in self.rules[r][1]:
+                base[i] += d
+
+        if limit is None:
+            # Nothing ever stops the loop: the program doesn't halt
+            raise RuntimeError("Fractran program loops forever")
+        return limit + 1
+
+    # Final register contents as {prime: exponent}.  Handy when the
+    # answer is an exponent and the integer itself would be enormous.
+    def exponents(self, n, fast=False, **limits):
+        regs, rest = self.load(n)
+        self.execute(regs, fast, **limits)
+        return { p: e for p, e in zip(self.primes, regs) if e }
+
+    def run(self, n, fast=False, **limits):
+        regs, rest = self.load(n)
+        self.execute(regs, fast, **limits)
+        return self.value(regs, rest)
+
+def compile(prog):
+    return Program(prog)
+
+# Longest rule sequence that fast mode looks for
+MAX_LOOP = 3
+
+# With a deadline, the clock is only read every this many steps
+CLOCK_CHECK = 1024
+
+# One run of a batch.  Returns (True, result) or (False, exception) so
+# that a failed run (of any kind) doesn't stop the rest of the batch.
+class _BatchRun:
+    def __init__(self, prog, fast, exponents, max_steps, timeout):
+        self.prog = prog if isinstance(prog, Program) else compile(prog)
+        self.method = self.prog.exponents if exponents else self.prog.run
+        self.fast = fast
+        self.max_steps = max_steps
+        self.timeout = timeout
+
+    def __call__(self, n):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            return True, self.method(n, self.fast, max_steps=self.max_steps, deadline=deadline)
+        except Exception as e:
+            return False, e
+
+# Set up in each worker process by _start_worker()
+_worker_run = None
+
+def _start_worker(*args):
+    global _worker_run
+    _worker_run = _BatchRun(*args)
+
+def _run_in_worker(n):
+    return _worker_run(n)
+
+# Run prog (a list of fractions or a compiled Program) on every value
+# in values, using a pool of worker processes.  Returns a list of final
+# values in order, or {prime: exponent} dicts with exponents=True.  If a
+# run goes over max_steps or timeout seconds (or never halts), the
+# exception is raised, or put in its place in the list with
+# return_exceptions=True.  workers=1 runs everything in this process.
+def run_batch(prog, values, workers=None, fast=True, exponents=False,
+              max_steps=None, timeout=None, return_exceptions=False):
+    values = list(values)
+    args = (prog, fast, exponents, max_steps, timeout)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(values))
+    if workers <= 1:
+        outcomes = map(_BatchRun(*args), values)
+    else:
+        # A few chunks per worker: big enough to cut down on messages,
+        # small enough that the slow runs get spread around
+        chunksize = max(1, len(values) // (4 * workers))
+        with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=args) as pool:
+            outcomes = list(pool.map(_run_in_worker, values, chunksize=chunksize))
+
+    results = []
+    for ok, result in outcomes:
+        if not ok and not return_exceptions:
+            raise result
+        results.append(result)
+    return results
+
+def expand_trace(trace):
+    for rules, repeats in trace:
+        for _ in range(repeats):
+            yield from rules
+
+# Same Fibonacci program as ex8.py.  The answer is the exponent of 2.
+fibcode = [
+    Fraction(17, 65),
+    Fraction(133, 34),
+    Fraction(17, 19),
+    Fraction(23, 17),
+    Fraction(2233, 69),
+    Fraction(23, 29),
+    Fraction(31, 23),
+    Fraction(74, 341),
+    Fraction(31, 37),
+    Fraction(41, 31),
+    Fraction(129, 287),
+    Fraction(41, 43),
+    Fraction(13, 41),
+    Fraction(1, 13),
+    Fraction(1, 3)
+    ]
+
+fibprog = compile(fibcode)
+
+def fibonacci(n):
+    return fibprog.exponents(78 * 5**(n - 1), fast=True).get(2, 0)
+
+# fibonacci() for many n at once, in parallel
+def fibonacci_batch(ns, workers=None, fast=True):
+    results = run_batch(fibprog, [78 * 5**(n - 1) for n in ns], workers, fast, exponents=True)
+    return [r.get(2, 0) for r in results]
+
+def test_fractran():
+    import ex8
+
+    # Same answers as the naive evaluator
+    for n in range(1, 12):
+        start = 78 * 5**(n - 1)
+        assert fibprog.run(start) == ex8.run(ex8.fibcode, start)
+        assert fibonacci(n) == ex8.fibonacci(n)
+
+    # Primes the program doesn't use pass straight through
+    adder = compile([Fraction(3, 2)])
+    assert adder.run(2**3 * 3**4 * 7) == 3**7 * 7
+    assert adder.exponents(2**3 * 3**4) == { 3: 7 }
+
+    # Nothing fires: n comes back unchanged
+    assert fibprog.run(7) == 7
+
+    # Fast mode takes the same steps as one rule at a time
+    for n in range(1, 10):
+        start = 78 * 5**(n - 1)
+        slow, fast = [], []
+        regs_slow, _ = fibprog.load(start)
+        regs_fast, _ = fibprog.load(start)
+        steps = fibprog.execute(regs_slow, trace=slow)
+        assert fibprog.execute(regs_fast, fast=True, trace=fast) == steps
+        assert regs_fast == regs_slow
+        assert list(expand_trace(fast)) == list(expand_trace(slow))
+        assert len(fast) < len(slow) or n < 3
+    assert fibonacci(100) == 354224848179261915075
+
+    # A loop that never stops is an error, not a hang
+    try:
+        compile([Fraction(2, 1)]).run(1, fast=True)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+
+    # Batches
+    starts = [78 * 5**(n - 1) for n in range(1, 12)]
+    assert run_batch(fibcode, starts, workers=1, fast=False) == [fibprog.run(n) for n in starts]
+    assert fibonacci_batch(range(1, 30), workers=1) == [fibonacci(n) for n in range(1, 30)]
+    results = run_batch(fibprog, [starts[0], starts[-1], 1], workers=1, fast=False,
+                        max_steps=100, return_exceptions=True)
+    assert results[0] == fibprog.run(starts[0])
+    assert isinstance(results[1], StepLimitExceeded)
+    assert results[2] == 1
+    try:
+        run_batch(fibprog, starts, workers=1, fast=False, max_steps=100)
+        assert False, "expected StepLimitExceeded"
+    except StepLimitExceeded:
+        pass
+    # Fast mode keeps to the budget too, even when one loop jumps past it
+    regs, _ = adder.load(2**100)
+    try:
+        adder.execute(regs, fast=True, max_steps=10)
+        assert False, "expected StepLimitExceeded"
+    except StepLimitExceeded:
+        pass
+    regs, _ = adder.load(2**100)
+    assert adder.execute(regs, fast=True, max_steps=100) == 100
+    results = run_batch([Fraction(3, 2)], [2**100, 2**5], workers=1, max_steps=10,
+                        return_exceptions=True)
+    assert isinstance(results[0], StepLimitExceeded)
+    assert results[1] == 3**5
+    results = run_batch(fibprog, starts, workers=1, max_steps=100, return_exceptions=True)
+    assert [isinstance(r, StepLimitExceeded) for r in results] == \
+           [isinstance(r, StepLimitExceeded) for r in
+            run_batch(fibprog, starts, workers=1, fast=False, max_steps=100,
+                      return_exceptions=True)]
+    results = run_batch(fibprog, [78 * 5**20], workers=1, fast=False, timeout=0.01,
+                        return_exceptions=True)
+    assert isinstance(results[0], TimeoutError)
+    results = run_batch([Fraction(2, 1)], [1], workers=1, return_exceptions=True)
+    assert isinstance(results[0], RuntimeError)
+
+    # With a real pool.  Only when run as a script: starting workers
+    # while this module is still being imported deadlocks them (forked
+    # workers wait on the import lock), and spawned workers import it
+    # again themselves.
+    if __name__ == '__main__':
+        results = run_batch(fibprog, starts[:5] + [0], workers=2, return_exceptions=True)
+        assert results[:5] == [fibprog.run(n, fast=True) for n in starts[:5]]
+        assert isinstance(results[5], ValueError)
+
+    print('Good fractran')
+
+test_fractran()
@@ -0,0 +1,183 @@
+# fracwire.py
+# -----------------------------------------------------------------------------
+# A compact binary format for streams of fractions
+#
+# Pickle writes a class reference and a reduce call for every Fraction.
+# Most fractions people actually use have small numerators and
+# denominators, so they fit in a few bytes each with a variable-length
+# integer ("varint") encoding:
+#
+#   - a varint stores 7 bits per byte, low bits first.  The high bit of
+#     each byte says "more bytes follow".  So 0-127 take one byte,
+#     128-16383 take two, and so on.
+#   - numerators can be negative, so they're "zigzag" encoded first:
+#     0, -1, 1, -2, 2, ... become 0, 1, 2, 3, 4, ...  Small negative numbers
+#     stay small.
+#   - denominators are always at least 1, so d - 1 is stored.
+#
+# A stream starts with one byte giving the mode.  In delta mode, each
+# fraction is stored as the difference of its numerator and denominator
+# from the previous one.  That only pays off when the numerators and
+# the denominators each change slowly from one value to the next, as in
+# a series over a fixed denominator (n/1009, (n+1)/1009, ...).  Data
+# that is merely sorted by value has unrelated neighbouring parts
+# (1/3, 500/1499, 2/5, ...) and gets nothing from it.
+#
+#    >>> data = encode([Fraction(1, 2), Fraction(-3, 4)])
+#    >>> len(data)
+#    5
+#    >>> decode(data)
+#    [Fraction(1, 2), Fraction(-3, 4)]
+#    >>>
+#
+# Decoder.feed() accepts the stream in pieces of any size (say, as it
+# arrives from a socket) and hands back whatever fractions are complete.
+# -----------------------------------------------------------------------------
+
+from ex7 import Fraction
+
+PLAIN = 0
+DELTA = 1
+
+def zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+def unzigzag(z):
+    return z >> 1 if not z & 1 else -((z + 1) >> 1)
+
+def _put_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+class Encoder:
+    def __init__(self, delta=False):
+        self.mode = DELTA if delta else PLAIN
+        self.started = False
+        self.prev = (0, 1)
+
+    # Encode some more fractions.  Returns the bytes to send (the first
+    # call includes the mode byte).
+    def encode(self, fracs):
+        out = bytearray()
+        if not self.started:
+            out.append(self.mode)
+            self.started = True
+        if self.mode == DELTA:
+            pn, pd = self.prev
+            for f in fracs:
+                n, d = f.numerator, f.denominator
+                _put_varint(out, zigzag(n - pn))
+                _put_varint(out, zigzag(d - pd))
+                pn, pd = n, d
+            self.prev = (pn, pd)
+        else:
+            for f in fracs:
+                _put_varint(out, zigzag(f.numerator))
+                _put_varint(out, f.denominator - 1)
+        return bytes(out)
+
+class Decoder:
+    def __init__(self):
+        self.mode = None
+        self.buffer = b''
+        self.prev = (0, 1)
+
+    # Decode as much of the stream as possible.  Returns a list of the
+    # fractions completed by this piece of data.  A fraction split
+    # across two pieces is kept back until the rest arrives.
+    def feed(self, data):
+        buf = self.buffer + bytes(data)
+        pos = 0
+        if self.mode is None:
+            if not buf:
+                return []
+            self.mode = buf[0]
+            if self.mode not in (PLAIN, DELTA):
+                raise ValueError(f'unknown fraction stream mode {self.mode}')
+            pos = 1
+
+        result = []
+        first = None               # numerator part, waiting for its denominator
+        value = shift = 0
+        done = pos                 # end of the last complete fraction
+        pn, pd = self.prev
+        delta = self.mode == DELTA
+        for i, byte in enumerate(buf[pos:], pos):
+            if byte & 0x80:
+                value |= (byte & 0x7f) << shift
+                shift += 7
+                continue
+            if shift:
+                byte = value | (byte << shift)
+                value = shift = 0
+            if first is None:
+                first = byte
+                continue
+            if delta:
+                pn += unzigzag(first)
+                pd += unzigzag(byte)
+            else:
+                pn, pd = unzigzag(first), byte + 1
+            result.append(Fraction(pn, pd))
+            first = None
+            done = i + 1
+        self.prev = (pn, pd)
+        self.buffer = buf[done:]
+        return result
+
+    # Call at the end of the stream to check nothing was cut off
+    def close(self):
+        if self.buffer:
+            raise ValueError('fraction stream ended in the middle of a value')
+
+def encode(fracs, delta=False):
+    return Encoder(delta).encode(fracs)
+
+def decode(data):
+    decoder = Decoder()
+    result = decoder.feed(data)
+    decoder.close()
+    return result
+
+def test_wire():
+    assert [zigzag(n) for n in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    assert all(unzigzag(zigzag(n)) == n for n in range(-1000, 1000))
+
+    fracs = [Fraction(1, 2), Fraction(-3, 4), Fraction(0, 1), Fraction(2**100, 3),
+             Fraction(-2**70 - 1, 2**65), Fraction(1000, 1)]
+    data = encode(fracs)
+    assert len(encode(fracs[:2])) == 5
+    assert decode(data) == fracs
+    assert decode(encode(fracs, delta=True)) == fracs
+    assert decode(encode([])) == []
+
+    # A series on one denominator is smaller in delta mode
+    ordered = [Fraction(n, 1009) for n in range(100000, 101000)]
+    assert len(encode(ordered, delta=True)) < len(encode(ordered)) // 2
+    assert decode(encode(ordered, delta=True)) == ordered
+
+    # Pieces of every size, with the encoder called in pieces too
+    for delta in (False, True):
+        enc = Encoder(delta)
+        data = enc.encode(fracs[:3]) + enc.encode(fracs[3:])
+        for size in (1, 2, 3, 7):
+            dec = Decoder()
+            out = []
+            for i in range(0, len(data), size):
+                out.extend(dec.feed(data[i:i + size]))
+            dec.close()
+            assert out == fracs
+
+    dec = Decoder()
+    dec.feed(data[:-1])
+    try:
+        dec.close()
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    print('Good fraction streams')
+
+test_wire()
@@ -0,0 +1,247 @@
+# lazyfrac.py
+# -----------------------------------------------------------------------------
+# Lazy fraction expressions
+#
+# With Fractions, an expression such as  a*b + c*d - e/f  builds and
+# reduces a new Fraction at every operator: five gcds for one answer.
+#
+# In lazy mode, operators don't compute anything.  They build a graph
+# of the expression instead:
+#
+#    >>> a, b = Lazy(Fraction(1, 2)), Lazy(Fraction(2, 3))
+#    >>> expr = a*b + a
+#    >>> expr.value()
+#    Fraction(5, 6)
+#    >>>
+#
+# value() works through the graph with plain (numerator, denominator)
+# integer pairs that are never reduced, and reduces once at the very end.
+# The result is remembered, so asking again is free.  A node that is
+# used in several places (like 'a' above) is only evaluated once per
+# evaluation.  Building the same operation on the same nodes twice gives
+# back the same node (as long as the first one is still in use), so
+# common subexpressions are shared automatically.
+#
+# Leaves can be named with var() and given different values on every
+# evaluation:
+#
+#    >>> x = var('x')
+#    >>> expr = x*x + 1
+#    >>> [expr.evaluate(x=v) for v in (1, 2, 3)]
+#    [Fraction(2, 1), Fraction(5, 1), Fraction(10, 1)]
+#    >>>
+#
+# The nodes are put in evaluation order once (see _order()), so every
+# evaluation after the first is just a loop over a list.
+# -----------------------------------------------------------------------------
+
+import gc
+import weakref
+
+from ex7 import Fraction
+
+def _add(a, b):
+    return (a[0] * b[1] + a[1] * b[0], a[1] * b[1])
+
+def _sub(a, b):
+    return (a[0] * b[1] - a[1] * b[0], a[1] * b[1])
+
+def _mul(a, b):
+    return (a[0] * b[0], a[1] * b[1])
+
+def _div(a, b):
+    if b[0] == 0:
+        raise ZeroDivisionError('Fraction division by zero')
+    return (a[0] * b[1], a[1] * b[0])
+
+OPERATIONS = { '+': _add, '-': _sub, '*': _mul, '/': _div }
+
+# Commutative operations are looked up with their operands in a fixed
+# order, so that a*b and b*a become the same node
+COMMUTATIVE = { '+', '*' }
+
+class Lazy:
+    # op is None for a constant leaf, 'var' for a named leaf, otherwise
+    # one of OPERATIONS with two Lazy operands
+    def __init__(self, value=None, op=None, args=(), name=None):
+        self.op = op
+        self.args = args
+        self.name = name
+        self.parts = None if value is None else (value.numerator, value.denominator)
+        # Shared nodes, by (op, id(left), id(right)).  Weak, so that a
+        # long-lived node doesn't keep every expression built from it.
+        self.cache = weakref.WeakValueDictionary()
+        self._value = None
+        self._plan = None
+
+    # Make (or reuse) the node for 'self op other'
+    def _node(self, op, left, right):
+        left, right = _lift(left), _lift(right)
+        if left is None or right is None:
+            return NotImplemented
+        if op in COMMUTATIVE and id(right) < id(left):
+            left, right = right, left
+        # The node holds on to both operands, so their ids can't be
+        # reused while the cache entry exists
+        key = (op, id(left), id(right))
+        node = left.cache.get(key)
+        if node is None:
+            node = left.cache[key] = Lazy(op=op, args=(left, right))
+        return node
+
+    def __add__(self, other):
+        return self._node('+', self, other)
+
+    def __radd__(self, other):
+        return self._node('+', other, self)
+
+    def __sub__(self, other):
+        return self._node('-', self, other)
+
+    def __rsub__(self, other):
+        return self._node('-', other, self)
+
+    def __mul__(self, other):
+        return self._node('*', self, other)
+
+    def __rmul__(self, other):
+        return self._node('*', other, self)
+
+    def __truediv__(self, other):
+        return self._node('/', self, other)
+
+    def __rtruediv__(self, other):
+        return self._node('/', other, self)
+
+    def __repr__(self):
+        if self.op is None:
+            return repr(Fraction(*self.parts))
+        if self.op == 'var':
+            return self.name
+        return f'({self.args[0]!r} {self.op} {self.args[1]!r})'
+
+    # Every node this one depends on, each exactly once, with operands
+    # before the operations that use them
+    def _order(self):
+        if self._plan is None:
+            order = []
+            seen = set()
+            stack = [(self, False)]
+            while stack:
+                node, ready = stack.pop()
+                if ready:
+                    order.append(node)
+                    continue
+                if id(node) in seen:
+                    continue
+                seen.add(id(node))
+                stack.append((node, True))
+                for arg in reversed(node.args):
+                    if id(arg) not in seen:
+                        stack.append((arg, False))
+            self._plan = order
+        return self._plan
+
+    def variables(self):
+        return { node.name for node in self._order() if node.op == 'var' }
+
+    # Evaluate with some values for the named leaves.  Returns a Fraction.
+    def evaluate(self, **bindings):
+        values = { }
+        for node in self._order():
+            if node.op is None:
+                values[id(node)] = node.parts
+            elif node.op == 'var':
+                try:
+                    v = bindings[node.name]
+                except KeyError:
+                    raise NameError(f'no value given for {node.name!r}') from None
+                values[id(node)] = (v.numerator, v.denominator)
+            else:
+                left, right = node.args
+                values[id(node)] = OPERATIONS[node.op](values[id(left)], values[id(right)])
+        n, d = values[id(self)]
+        return Fraction(n, d)
+
+    # The value of an expression with no named leaves, remembered
+    def value(self):
+        if self._value is None:
+            self._value = self.evaluate()
+        return self._value
+
+# Constant leaves made from plain numbers, one per value, so that
+# (a + 1) and (a + 1) are the same node.  They go away when no
+# expression uses them any more.
+_constants = weakref.WeakValueDictionary()
+
+def _lift(value):
+    if isinstance(value, Lazy):
+        return value
+    if hasattr(value, 'numerator') and hasattr(value, 'denominator'):
+        key = (value.numerator, value.denominator)
+        node = _constants.get(key)
+        if node is None:
+            node = _constants[key] = Lazy(value)
+        return node
+    return None
+
+def var(name):
+    return Lazy(op='var', name=name)
+
+def lazy(value):
+    return _lift(value)
+
+def test_lazy():
+    a, b, c = Lazy(Fraction(1, 2)), Lazy(Fraction(2, 3)), Lazy(Fraction(-3, 4))
+    d, e, f = Fraction(5, 6), Fraction(7, 8), Fraction(9, 10)
+    expr = a*b + c*d - e/f
+    expected = Fraction(1, 2)*Fraction(2, 3) + Fraction(-3, 4)*d - e/f
+    assert expr.value() == expected
+    assert expr.value() is expr.value()
+
+    # Shared subexpressions
+    assert a*b is a*b
+    assert a*b is b*a
+    assert a - b is not b - a
+    assert a + 1 is a + 1
+    assert 2 * a is a * Fraction(2, 1)
+    assert lazy(3) is lazy(Fraction(3, 1))
+    shared = a*b
+    g = shared + shared * shared
+    assert len(g._order()) == 5        # a, b, a*b, (a*b)*(a*b), g
+    assert g.value() == Fraction(1, 3) + Fraction(1, 9)
+
+    # Expressions that are dropped go away, and so do their constants
+    for i in range(1000):
+        (a - (i + 1000)).value()
+    gc.collect()
+    assert len(a.cache) < 10
+    assert not any(1000 <= n < 2000 for n, _ in _constants)
+
+    # Mixed with ints and plain Fractions on either side
+    assert (1 - a).value() == Fraction(1, 2)
+    assert (2 / b).value() == 3
+    assert (Fraction(1, 4) + a).value() == Fraction(3, 4)
+
+    # Many bindings of the same graph
+    x, y = var('x'), var('y')
+    poly = x*x + 3*x*y - y/2
+    assert poly.variables() == { 'x', 'y' }
+    for xv in range(-3, 4):
+        for yv in (Fraction(1, 3), Fraction(-5, 2)):
+            assert poly.evaluate(x=xv, y=yv) == xv*xv + 3*xv*yv - yv/2
+
+    try:
+        poly.evaluate(x=1)
+        assert False, "expected NameError"
+    except NameError:
+        pass
+    try:
+        (a / (b - b)).value()
+        assert False, "expected ZeroDivisionError"
+    except ZeroDivisionError:
+        pass
+
+    print('Good lazy fractions')
+
+test_lazy()